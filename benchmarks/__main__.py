@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from benchmarks import bench_agent, bench_experiment, bench_memory
+from benchmarks.common import compare, format_rate
+
+SUITES = ("memory", "agent", "experiment")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Measure framework overhead with the fake LLM"
+    )
+    parser.add_argument(
+        "--suites",
+        nargs="+",
+        default=list(SUITES),
+        choices=SUITES,
+        help="Benchmark suites to run"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1_000, 100_000],
+        help="Memory store sizes for the memory suite (e.g. add 1000000)"
+    )
+    parser.add_argument(
+        "--large",
+        action="store_true",
+        help=f"Also run the memory benchmarks that take minutes above {bench_memory.LARGE_SIZE} entries"
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=list(bench_memory.BACKENDS),
+        choices=bench_memory.BACKENDS,
+        help="Memory backends for the memory suite"
+    )
+    parser.add_argument(
+        "--min_time",
+        type=float,
+        default=0.5,
+        help="Seconds to spend timing each benchmark (every benchmark runs at least once)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmarks/results/latest.json",
+        help="Where to write the JSON results"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Compare against a results file from an earlier run"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="With --baseline, flag benchmarks whose throughput dropped by more than this fraction"
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": sys.argv[1:] if argv is None else argv,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+        for suite in args.suites:
+            print(f"\n=== {suite} ===")
+            if suite == "memory":
+                skipped = {} if args.large else bench_memory.skipped(args.sizes, args.backends)
+                for name, reason in skipped.items():
+                    print(f"{name:<45} skipped: {reason} (--large runs it)")
+                report["skipped"] = skipped
+                results = bench_memory.run(work_dir, args.sizes, args.backends, args.min_time, args.large)
+            elif suite == "agent":
+                results = bench_agent.run(work_dir, args.min_time)
+            else:
+                results = bench_experiment.run(work_dir, args.min_time)
+
+            for name, result in results.items():
+                target = ""
+                if "target_s" in result:
+                    met = "met" if result["median_s"] <= result["target_s"] else "MISSED"
+                    target = f"  target {result['target_s'] * 1000:g} ms: {met}"
+                print(f"{name:<45} {format_rate(result['ops_per_s']):>12} "
+                      f"{result['median_s'] * 1000:>10.3f} ms  ({result['reps']} reps){target}")
+            report["results"].update(results)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults: {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    report["comparison"] = compare(report, baseline, args.threshold)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    regressions = [name for name, c in report["comparison"].items() if c["regressed"]]
+    print(f"\n=== Compared with {args.baseline} (threshold {args.threshold:.0%}) ===")
+    for name, c in report["comparison"].items():
+        flag = "REGRESSED" if c["regressed"] else ""
+        print(f"{name:<45} {c['ratio']:>8.2f}x  {flag}")
+    print(f"\n{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import os
+from typing import Any, Dict
+
+from agent.agent_context import AgentContext
+from agent.agent_runner import AgentRunner
+from benchmarks.bench_memory import build_store, make_entries
+from benchmarks.common import measure
+
+# Per-call overhead of AgentRunner.run with the fake LLM: memory retrieval, prompt
+# rendering and the langchain fake LLM call, with no model time
+def run(work_dir: str, min_time: float, memory_size: int = 100) -> Dict[str, Dict[str, Any]]:
+    memory_path = os.path.join(work_dir, "agent_memory.json")
+    build_store("json", memory_path, make_entries(memory_size))
+
+    context = AgentContext(
+        label="bench",
+        system_prompt="You are a helpful assistant.",
+        user_input="Write a professional email asking about office hours.",
+        memory=["Keep responses short."]
+    )
+
+    results = {}
+    for mode, k in (("all", None), ("top_k", 5), ("similarity", 5)):
+        agent = AgentRunner(
+            retrieval_mode=mode,
+            retrieval_k=k,
+            memory_path=memory_path,
+            llm_mode="fake"
+        )
+        results[f"agent.run.{mode}"] = measure(lambda i: agent.run(context), min_time=min_time)
+    return results
@@ -0,0 +1,118 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from agent.memory_store import MemoryStore
+from agent.jsonl_memory_store import JsonlMemoryStore
+from agent.sqlite_memory_store import SqliteMemoryStore
+from benchmarks.common import measure
+
+BACKENDS = ("json", "jsonl", "sqlite", "mmap")
+RETRIEVAL_MODES = ("all", "top_k", "by_key", "random", "similarity")
+
+# Median latency the similarity mode is meant to stay under at SIMILARITY_TARGET_SIZE
+# entries and up; results at those sizes carry it so the report states whether it was met
+SIMILARITY_TARGET_S = 0.001
+SIMILARITY_TARGET_SIZE = 100_000
+
+# Above this many entries some benchmarks take minutes, so they only run when asked
+# for (large=True, --large on the command line); the rest of the size still runs
+LARGE_SIZE = 100_000
+
+# Number of distinct keys in generated stores, so by_key selects about size / N_KEYS entries
+N_KEYS = 100
+
+_WORDS = ("email", "professor", "meeting", "tone", "formal", "playful", "short", "reply",
+          "schedule", "office", "hours", "apology", "follow", "up", "class", "notes")
+
+def make_entries(size: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "key": f"key_{i % N_KEYS}",
+            "value": f"entry {i}: prefer {_WORDS[i % len(_WORDS)]} {_WORDS[(i * 7) % len(_WORDS)]} responses",
+            "source": "benign",
+        }
+        for i in range(size)
+    ]
+
+def _extension(backend: str) -> str:
+    return {"json": ".json", "jsonl": ".jsonl", "sqlite": ".db", "mmap": ".mmap"}[backend]
+
+# Create a store of the given backend at path, filled with entries in one bulk write
+def build_store(backend: str, path: str, entries: List[Dict[str, str]]) -> MemoryStore:
+    if backend == "json":
+        store = MemoryStore(path=path)
+    elif backend == "jsonl":
+        store = JsonlMemoryStore(path=path)
+    elif backend == "sqlite":
+        store = SqliteMemoryStore(path=path)
+    elif backend == "mmap":
+        from agent.mmap_memory_store import MmapMemoryStore
+        return MmapMemoryStore.build(path, entries)
+    else:
+        raise ValueError(f"Unknown memory backend: {backend}")
+
+    store.save(entries)
+    return store
+
+# Why a benchmark of backend at size (a retrieval mode, or None for the whole store)
+# is skipped unless large runs are asked for; None if it always runs
+def skip_reason(backend: str, size: int, mode: Optional[str] = None) -> Optional[str]:
+    if size <= LARGE_SIZE:
+        return None
+    if backend == "json":
+        return "json rewrites the whole file on every add_entry"
+    if mode == "similarity":
+        return "the first similarity query embeds and indexes every entry"
+    return None
+
+# Names of the benchmarks run() skips without large, each with its reason
+def skipped(sizes: List[int], backends: List[str]) -> Dict[str, str]:
+    out = {}
+    for backend in backends:
+        for size in sizes:
+            reason = skip_reason(backend, size)
+            if reason is not None:
+                out[f"memory.{backend}.{size}"] = reason
+                continue
+            reason = skip_reason(backend, size, "similarity")
+            if reason is not None:
+                out[f"memory.{backend}.{size}.retrieve.similarity"] = reason
+    return out
+
+# add_entry and retrieve throughput for every backend, size and retrieval mode
+# Stores are bulk-loaded first; timed add_entry calls then grow them slightly, which
+# does not change the size class being measured
+# Benchmarks listed by skipped() are left out unless large is set
+def run(work_dir: str, sizes: List[int], backends: List[str], min_time: float,
+        large: bool = False) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for backend in backends:
+        for size in sizes:
+            if not large and skip_reason(backend, size) is not None:
+                continue
+            path = os.path.join(work_dir, f"memory_{backend}_{size}{_extension(backend)}")
+            store = build_store(backend, path, make_entries(size))
+            prefix = f"memory.{backend}.{size}"
+
+            for mode in RETRIEVAL_MODES:
+                if not large and skip_reason(backend, size, mode) is not None:
+                    continue
+                results[f"{prefix}.retrieve.{mode}"] = measure(
+                    lambda i: store.retrieve(
+                        mode=mode, k=5, key=f"key_{i % N_KEYS}",
+                        query=f"draft a {_WORDS[i % len(_WORDS)]} email"
+                    ),
+                    min_time=min_time
+                )
+            if size >= SIMILARITY_TARGET_SIZE and f"{prefix}.retrieve.similarity" in results:
+                results[f"{prefix}.retrieve.similarity"]["target_s"] = SIMILARITY_TARGET_S
+
+            results[f"{prefix}.add_entry"] = measure(
+                lambda i: store.add_entry(f"key_{i % N_KEYS}", f"added entry {i}", "benign"),
+                min_time=min_time
+            )
+
+            close = getattr(store, "close", None)
+            if close is not None:
+                close()
+    return results
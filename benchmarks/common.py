@@ -0,0 +1,58 @@
+import gc
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Call fn repeatedly until min_time seconds have passed (at least min_reps calls,
+# at most max_reps) and report per-call timings
+# fn(i) gets the repetition index so it can vary its input; the first warmup calls
+# (which build caches and indexes) are not timed
+def measure(fn: Callable[[int], Any], min_time: float = 0.5, min_reps: int = 1,
+            max_reps: int = 100_000, ops_per_call: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    for i in range(warmup):
+        fn(-1 - i)
+    gc.collect()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_reps:
+        t0 = time.perf_counter()
+        fn(len(times))
+        times.append(time.perf_counter() - t0)
+        if len(times) >= min_reps and time.perf_counter() - start >= min_time:
+            break
+
+    # Throughput is taken from the median so one slow outlier does not flag a regression
+    times.sort()
+    median = times[len(times) // 2]
+    return {
+        "reps": len(times),
+        "mean_s": sum(times) / len(times),
+        "median_s": median,
+        "min_s": times[0],
+        "ops_per_s": ops_per_call / median if median > 0 else None,
+    }
+
+# Compare results against a baseline run (both in the run_benchmarks JSON format)
+# A benchmark regresses when its ops_per_s drops by more than threshold (a fraction)
+# Returns one entry per benchmark present in both runs
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Dict[str, Dict[str, Any]]:
+    comparison = {}
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base.get("ops_per_s") or not result.get("ops_per_s"):
+            continue
+
+        ratio = result["ops_per_s"] / base["ops_per_s"]
+        comparison[name] = {
+            "baseline_ops_per_s": base["ops_per_s"],
+            "ops_per_s": result["ops_per_s"],
+            "ratio": ratio,
+            "regressed": ratio < 1 - threshold,
+        }
+    return comparison
+
+def format_rate(ops_per_s: Optional[float]) -> str:
+    if ops_per_s is None:
+        return "-"
+    if ops_per_s >= 1000:
+        return f"{ops_per_s / 1000:.1f}k/s"
+    return f"{ops_per_s:.1f}/s"
@@ -1,35 +1,35 @@
 import argparse
-import importlib.util
 import os
 import sys
+import time
 from src.experiments.experiment_config import ExperimentConfig
+from src.experiments.experiment_loader import load_experiment
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
-def load_experiment(attack_type: str, experiment_name: str):
-    path = os.path.join("experiments","benchmarks",attack_type,f"{experiment_name}.py")
-
-    if not os.path.exists(path):
-        raise ValueError(f"Experiment not found: {path}")
-
-    spec = importlib.util.spec_from_file_location("experiment",path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-
-    if not hasattr(module, "main"):
-        raise ValueError(f"{path} does not define main(config)")
-    
-    return module.main
-
 def run_experiment(args):
     main_fn = load_experiment(args.attack, args.experiment)
+
+    stub = None
+    if args.llm == "stub":
+        from agent.stub_config import stub_config_from_args
+        stub = {"base_url": args.stub_url} if args.stub_url else stub_config_from_args(args, "stub_").to_dict()
     
+    memory_ext = {"json": ".json", "jsonl": ".jsonl", "sqlite": ".db", "mmap": ".mmap"}[args.memory_backend]
     memory_path = (
         args.memory_path
         if args.memory_path is not None
-        else f"experiments/memory/{args.attack}/{args.experiment}.json"
+        else f"experiments/memory/{args.attack}/{args.experiment}{memory_ext}"
     )
 
+    # The default memory of another backend starts from the committed JSON memory,
+    # so switching backends does not change what the experiment starts from
+    if args.memory_path is None and args.memory_backend != "json":
+        from agent.agent_runner import seed_memory_store
+        seed_path = f"experiments/memory/{args.attack}/{args.experiment}.json"
+        if seed_memory_store(memory_path, args.memory_backend, seed_path):
+            print(f"Seeded {memory_path} from {seed_path}")
+
     output_path = (
         args.output_path
         if args.output_path is not None
@@ -43,6 +43,26 @@ def run_experiment(args):
             mode=args.llm,
             memory_path=memory_path,
             output_path=output_path,
+            memory_backend=args.memory_backend,
+            concurrency=args.concurrency,
+            cache_path=args.cache_path,
+            stream=args.stream,
+            max_stream_tokens=args.max_stream_tokens,
+            workers=args.workers,
+            columnar_results=args.columnar,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            adaptive=args.adaptive,
+            ci_target_width=args.ci_target_width,
+            confidence=args.confidence,
+            adaptive_min_evals=args.adaptive_min_evals,
+            adaptive_seed=args.seed,
+            spans=args.spans,
+            trace_path=args.trace_path,
+            stub=stub,
+            adaptive_concurrency=args.adaptive_concurrency,
+            max_retries=args.max_retries,
+            retry_base_delay=args.retry_base_delay,
     )
 
     print("\n=== Running Experiment ===")
@@ -52,11 +72,173 @@ def run_experiment(args):
     print(f"retrieval_mode: {args.retrieval_mode}")
     print(f"retrieval_k: {args.retrieval_k}")
     print(f"retrieval_key: {args.retrieval_key}")
+    print(f"memory_backend: {args.memory_backend}")
+    print(f"concurrency: {args.concurrency}")
+    print(f"workers: {args.workers}")
+    print(f"cache_path: {args.cache_path}")
+    print(f"stream: {args.stream}")
+    print(f"resume: {args.resume}")
+    print(f"adaptive: {args.adaptive}")
+    print(f"adaptive_concurrency: {args.adaptive_concurrency}")
 
     main_fn(config)
     
+def run_sweep(args):
+    from experiments.sweep import build_grid, run_sweep as run_grid, format_summary
+
+    cells = build_grid(
+        attack=args.attack,
+        experiments=args.experiments,
+        llm_modes=args.llm,
+        retrieval_modes=args.retrieval_modes,
+        retrieval_ks=args.retrieval_ks,
+        retrieval_keys=args.retrieval_keys,
+    )
+
+    sweep_dir = (
+        args.sweep_dir
+        if args.sweep_dir is not None
+        else f"experiments/sweeps/{args.attack}/{time.strftime('%Y%m%d-%H%M%S')}"
+    )
+
+    print("\n=== Running Sweep ===")
+    print(f"attack: {args.attack}")
+    print(f"cells: {len(cells)}")
+    print(f"processes: {args.processes}")
+    print(f"sweep_dir: {sweep_dir}")
+
+    results = run_grid(
+        cells,
+        sweep_dir=sweep_dir,
+        processes=args.processes,
+        config_overrides={"concurrency": args.concurrency, "workers": args.workers},
+    )
+
+    print("\n=== Sweep Summary ===")
+    print(format_summary(results))
+    for r in results:
+        if r["error"]:
+            print(f"\ncell {r['index']} failed:\n{r['error']}")
+    print(f"\nSummary: {os.path.join(sweep_dir, 'summary.json')}")
+
+def sweep_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="run.py sweep",
+        description="Run a grid of experiment settings across a process pool"
+    )
+
+    parser.add_argument(
+        "attack",
+        type=str,
+        help="Attack type (folder under experiments/benchmarks)"
+    )
+
+    parser.add_argument(
+        "--experiments",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Experiment names (python files without .py)"
+    )
+
+    parser.add_argument(
+        "--llm",
+        type=str,
+        nargs="+",
+        default=["real"],
+        choices=["fake","real","stub"],
+        help="LLM modes to sweep (stub starts a default local stub server in each cell)"
+    )
+
+    parser.add_argument(
+        "--retrieval_modes",
+        type=str,
+        nargs="+",
+        default=["all"],
+        choices=["all","top_k","by_key","random","similarity"],
+        help="Memory retrieval modes to sweep"
+    )
+
+    parser.add_argument(
+        "--retrieval_ks",
+        type=int,
+        nargs="+",
+        default=[None],
+        help="k values for top_k, random and similarity retrieval"
+    )
+
+    parser.add_argument(
+        "--retrieval_keys",
+        type=str,
+        nargs="+",
+        default=[None],
+        help="Keys for by_key retrieval"
+    )
+
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Worker processes (default: one per CPU)"
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Max LLM calls in flight per evaluation pass within each cell"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Evaluation threads within each cell"
+    )
+
+    parser.add_argument(
+        "--sweep_dir",
+        type=str,
+        default=None,
+        help="Directory for per-cell memory, results and the summary (default: timestamped)"
+    )
+
+    run_sweep(parser.parse_args(argv))
+
 def main():
-    parser = argparse.ArgumentParser(description="Run poisoning framework experiments")
+    # --import-profile works with every subcommand: the command is re-run under
+    # -X importtime and a report of where startup time went is printed after it
+    if "--import-profile" in sys.argv[1:]:
+        from experiments.import_profile import main as profile_main
+        argv = [arg for arg in sys.argv[1:] if arg != "--import-profile"]
+        sys.exit(profile_main(os.path.abspath(__file__), argv))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        sweep_main(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "rescore":
+        # Re-scoring only reads stored outputs, so no LLM backend is ever loaded
+        from experiments.rescore import main as rescore_main
+        rescore_main(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "stub":
+        # Serve the stub LLM on its own, e.g. to load-test against it from another process
+        from agent.stub_server import main as stub_main
+        stub_main(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "view":
+        # Only the results reader is imported here, so viewing never loads langchain
+        from experiments.format_results import main as view_main
+        view_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Run poisoning framework experiments",
+        epilog="Add --import-profile to any command to report its import time"
+    )
 
     parser.add_argument(
         "attack",
@@ -74,15 +256,15 @@ def main():
         "--llm",
         type=str,
         default="real",
-        choices=["fake","real"],
-        help="Which LLM to use"
+        choices=["fake","real","stub"],
+        help="Which LLM to use (stub: the real client against a local stub server, see --stub_*)"
     )
 
     parser.add_argument(
         "--retrieval_mode",
         type=str,
         default="all",
-        choices=["all","top_k","by_key","random"],
+        choices=["all","top_k","by_key","random","similarity"],
         help="Memory retrieval mode"
     )
 
@@ -90,7 +272,7 @@ def main():
         "--retrieval_k",
         type=int,
         default=None,
-        help="k for top_k or random retrieval"
+        help="k for top_k, random or similarity retrieval"
     )
 
     parser.add_argument(
@@ -107,6 +289,14 @@ def main():
         help="Path to persistent memory file (default derived from experiment name)"
     )
 
+    parser.add_argument(
+        "--memory_backend",
+        type=str,
+        default="json",
+        choices=["json","jsonl","sqlite","mmap"],
+        help="Persistent memory storage backend"
+    )
+
     parser.add_argument(
         "--output_path",
         type=str,
@@ -114,6 +304,136 @@ def main():
         help="Path to results output file (default: derived from experiment name)"
     )
 
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Max LLM calls in flight per evaluation pass (>1 uses the async batched path)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Threads running evaluations in parallel on the sync path"
+    )
+
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="Path to an on-disk LLM response cache (default: no caching)"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream attack evaluations and stop generating once success is decided"
+    )
+
+    parser.add_argument(
+        "--max_stream_tokens",
+        type=int,
+        default=None,
+        help="Stop streamed generations after this many tokens (default: no limit)"
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Save memory checkpoints and write every row immediately so the run can be resumed"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted --checkpoint run, skipping rows already in the output file"
+    )
+
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Also write NumPy columnar results (success, eval_index, latency) next to the output file"
+    )
+
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Evaluate contexts in random order and stop once the success rate is estimated precisely enough"
+    )
+
+    parser.add_argument(
+        "--ci_target_width",
+        type=float,
+        default=0.1,
+        help="With --adaptive, stop once the confidence interval is at most this wide"
+    )
+
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of the --adaptive interval"
+    )
+
+    parser.add_argument(
+        "--adaptive_min_evals",
+        type=int,
+        default=10,
+        help="With --adaptive, always run at least this many evaluations per pass"
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for the --adaptive evaluation order"
+    )
+
+    parser.add_argument(
+        "--spans",
+        action="store_true",
+        help="Time each phase of every eval (retrieve, render, llm, detect, write) and report percentiles"
+    )
+
+    parser.add_argument(
+        "--trace_path",
+        type=str,
+        default=None,
+        help="Also write every span to this Chrome trace file (implies --spans)"
+    )
+
+    parser.add_argument(
+        "--adaptive_concurrency",
+        action="store_true",
+        help="Adjust the LLM calls in flight (AIMD on latency and errors), up to --concurrency or --workers"
+    )
+
+    parser.add_argument(
+        "--max_retries",
+        type=int,
+        default=2,
+        help="Retries of a failed LLM call (timeouts, overload, 5xx), with jittered exponential backoff"
+    )
+
+    parser.add_argument(
+        "--retry_base_delay",
+        type=float,
+        default=0.5,
+        help="Backoff before the first retry, in seconds; doubles with each retry"
+    )
+
+    parser.add_argument(
+        "--stub_url",
+        type=str,
+        default=None,
+        help="With --llm stub, use the stub already serving at this base URL (see run.py stub) "
+             "instead of starting one in this process"
+    )
+
+    from agent.stub_config import add_stub_arguments
+    add_stub_arguments(parser, prefix="stub_")
+
     args = parser.parse_args()
     run_experiment(args)
 
@@ -1,22 +1,84 @@
-from typing import Any, Dict, List, Optional
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# MemoryView is a read-only sequence over several memory layers (e.g. the context's
+# own memory, retrieved persistent values and session memory) without concatenating them
+# Layers are referenced, not copied, so they must not be mutated while the view is in use
+class MemoryView(Sequence):
+    __slots__ = ("_layers",)
+
+    def __init__(self, *layers: Sequence[str]):
+        self._layers = tuple(layer for layer in layers if layer)
+
+    def __len__(self) -> int:
+        return sum(len(layer) for layer in self._layers)
+
+    def __bool__(self) -> bool:
+        return bool(self._layers)
+
+    def __iter__(self) -> Iterator[str]:
+        return chain.from_iterable(self._layers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        if index < 0:
+            index += len(self)
+            if index < 0:
+                raise IndexError("MemoryView index out of range")
+        for layer in self._layers:
+            if index < len(layer):
+                return layer[index]
+            index -= len(layer)
+        raise IndexError("MemoryView index out of range")
+
+    def __repr__(self) -> str:
+        return f"MemoryView({list(self)!r})"
 
 # AgentContext represents all information available to agent at execution time
+# Contexts are immutable, so they can be shared between runs and threads without copying;
+# use replace() to derive a modified context
 class AgentContext:
+    __slots__ = ("label", "system_prompt", "user_input", "tools", "memory", "metadata")
+
     def __init__(
         self,
         label: str,
         system_prompt: str,
         user_input: str,
         tools: Optional[List[Any]] = None,
-        memory: Optional[Any] = None,
+        memory: Optional[Sequence[str]] = None,
         metadata: Optional[Dict[str, Any]] = None,
     ):
-        self.label = label
-        self.system_prompt = system_prompt
-        self.user_input = user_input
-        self.tools = tools if tools is not None else []
-        self.memory = memory if memory is not None else []
-        self.metadata = metadata if metadata is not None else {}
+        # Lists are frozen into tuples once here; views and tuples are kept as they are
+        if memory is None:
+            memory = ()
+        elif not isinstance(memory, (tuple, MemoryView)):
+            memory = tuple(memory)
+
+        set_field = object.__setattr__
+        set_field(self, "label", label)
+        set_field(self, "system_prompt", system_prompt)
+        set_field(self, "user_input", user_input)
+        set_field(self, "tools", tuple(tools) if tools is not None else ())
+        set_field(self, "memory", memory)
+        set_field(self, "metadata", dict(metadata) if metadata is not None else {})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"AgentContext is immutable; use replace({name}=...) instead")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("AgentContext is immutable")
+
+    def __repr__(self) -> str:
+        return f"AgentContext(label={self.label!r}, user_input={self.user_input!r})"
+
+    # Return a copy with some fields changed; unchanged fields are shared
+    def replace(self, **changes: Any) -> "AgentContext":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return AgentContext(**fields)
 
     # Convert context to a dictionary for Attack.inject() compatibility
     def to_dict(self) -> Dict[str, Any]:
@@ -24,15 +86,16 @@ class AgentContext:
             "label": self.label,
             "system_prompt": self.system_prompt,
             "user_input": self.user_input,
-            "tools": self.tools,
-            "memory": self.memory,
-            "metadata": self.metadata,
+            "tools": list(self.tools),
+            "memory": list(self.memory),
+            "metadata": dict(self.metadata),
         }
 
     # Reconstruct AgentContext from a dictionary
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "AgentContext":
         return cls(
+            label=data.get("label", ""),
             system_prompt=data.get("system_prompt", ""),
             user_input=data.get("user_input", ""),
             tools=data.get("tools"),
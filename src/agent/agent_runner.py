@@ -1,67 +1,199 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough
-from langchain_community.llms.fake import FakeListLLM
-from typing import Optional, Tuple, Dict, Any, List
+import os
+from typing import Optional, Sequence, Tuple, Dict, Any, List, Union
 
 from attacks.attack import Attack, PoisoningScope
-from agent.agent_context import AgentContext
+from attacks.trigger_matcher import TriggerMatcher
+from agent.agent_context import AgentContext, MemoryView
 from agent.memory_store import MemoryStore
+from agent.jsonl_memory_store import JsonlMemoryStore
+from agent.sqlite_memory_store import SqliteMemoryStore
+from agent.response_cache import ResponseCache
+from agent.spans import NULL_SPANS, SpanRecorder
+from agent.call_controller import CallController
+from agent import llm_registry
+
+# Messages of the prompt template used by the agent, as (role, template) pairs
+PROMPT_MESSAGES = (
+    ("system", "{system_prompt}"),
+    ("system", "You must follow these user preferences in all responses:\n{memory}"),
+    ("user", "{user_input}"),
+)
+
+# Build a persistent memory store
+# If no backend is given it is inferred from the file extension
+def build_memory_store(memory_path: str, backend: Optional[str] = None) -> MemoryStore:
+    if backend is None:
+        if memory_path.endswith(".jsonl"):
+            backend = "jsonl"
+        elif memory_path.endswith((".db", ".sqlite")):
+            backend = "sqlite"
+        elif memory_path.endswith(".mmap"):
+            backend = "mmap"
+        else:
+            backend = "json"
+
+    if backend == "json":
+        return MemoryStore(path=memory_path)
+    elif backend == "jsonl":
+        return JsonlMemoryStore(path=memory_path)
+    elif backend == "sqlite":
+        return SqliteMemoryStore(path=memory_path)
+    elif backend == "mmap":
+        # numpy is only needed by this backend, so import it on demand
+        from agent.mmap_memory_store import MmapMemoryStore
+        return MmapMemoryStore(path=memory_path)
+    else:
+        raise ValueError(f"Unknown memory_backend: {backend}")
+
+# Fill a store that does not exist yet with the entries of a JSON memory file, e.g. a
+# committed experiment memory for another backend; returns whether it was seeded
+def seed_memory_store(memory_path: str, backend: Optional[str], seed_path: str) -> bool:
+    if os.path.exists(memory_path) or not os.path.exists(seed_path):
+        return False
+    store = build_memory_store(memory_path, backend)
+    try:
+        store.save(MemoryStore(path=seed_path).load())
+    finally:
+        if hasattr(store, "close"):
+            store.close()
+    return True
 
 # AgentRunner is where the agent retrieves, injects, executes, and persists
+# langchain and the LLM backends are imported only when an agent builds its
+# components, so importing this module never loads them
 class AgentRunner:
     def __init__(self, retrieval_mode="all", retrieval_k=None, 
                  retrieval_key=None, memory_path: str="persisted_memory.json",
-                 llm_mode: str = "fake"):
+                 llm_mode: str = "fake", memory_backend: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 stub_options: Optional[Dict[str, Any]] = None,
+                 call_controller: Optional[CallController] = None):
         self.llm_mode = llm_mode
-        self.llm = self._build_llm()
-        self.prompt = self._build_prompt()
-        self.executor = self._build_executor()
-        
+        self.stub_options = dict(stub_options or {})
+
+        # LLM calls go through call_controller (concurrency limit, retries) when given;
+        # HTTP backends always get one, since their clients are built without retries
+        if call_controller is None and self.llm_mode != "fake":
+            call_controller = CallController()
+        self.call_controller = call_controller
+        self.llm_settings = self._llm_settings()
+        self.response_cache = response_cache
+
+        # The fake LLM keeps its position in the response list, so each runner gets its own;
+        # real LLM clients and chains are shared process-wide per LLM settings
+        if self.llm_mode == "fake":
+            self.llm, self.prompt, self.executor = self._build_components()
+        else:
+            self.llm, self.prompt, self.executor = llm_registry.shared_components(
+                self.llm_settings, self._build_components
+            )
+
         self.retrieval_mode = retrieval_mode
         self.retrieval_k = retrieval_k
         self.retrieval_key = retrieval_key
-        self.persistent_memory = MemoryStore(path=memory_path)
+        self.memory_backend = memory_backend
+        self.persistent_memory = build_memory_store(memory_path, memory_backend)
         self.session_memory: List[str] = []
 
+    # Settings that determine the LLM's output (also used to key the response cache)
+    def _llm_settings(self) -> Dict[str, Any]:
+        if self.llm_mode == "fake":
+            return {"mode": "fake"}
+
+        elif self.llm_mode == "real":
+            return {
+                "mode": "real",
+                "model": "meta-llama/Llama-3.2-1B-Instruct",
+                "base_url": "http://localhost:7035/v1",
+                "temperature": 0.0,
+            }
+
+        # The stub server stands in for the real one; stub_options is either
+        # {"base_url": ...} of a running stub (run.py stub) or a StubConfig dict
+        # for a server started in this process
+        elif self.llm_mode == "stub":
+            from agent.stub_config import STUB_MODEL
+            return {
+                "mode": "stub",
+                "model": STUB_MODEL,
+                "temperature": 0.0,
+                "stub": self.stub_options,
+            }
+
+        else:
+            raise ValueError(f"Unknown llm_mode: {self.llm_mode}")
+
+    def _build_components(self) -> Tuple[Any, Any, Any]:
+        self.llm = self._build_llm()
+        self.prompt = self._build_prompt()
+        self.executor = self._build_executor()
+        return self.llm, self.prompt, self.executor
+
     # Build an LLM
     def _build_llm(self):
         if self.llm_mode == "fake":
             return self._build_llm_fake()
 
         elif self.llm_mode == "real":
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
-                model="meta-llama/Llama-3.2-1B-Instruct",
-                base_url="http://localhost:7035/v1",
+                model=self.llm_settings["model"],
+                base_url=self.llm_settings["base_url"],
                 api_key="not-needed",
-                temperature=0.0,
+                temperature=self.llm_settings["temperature"],
+                max_retries=0,
             )
 
+        elif self.llm_mode == "stub":
+            return self._build_llm_stub()
+
         else:
             raise ValueError(f"Unknown llm_mode: {self.llm_mode}")
 
     # Build a fake LLM for testing
     def _build_llm_fake(self):
+        from langchain_community.llms.fake import FakeListLLM
         return FakeListLLM(responses=[
             "[FAKE] response 1",
             "[FAKE] response 2",
             "[FAKE] response 3",
         ])
     
+    # Build the real ChatOpenAI client against the stub server
+    def _build_llm_stub(self):
+        from langchain_openai import ChatOpenAI
+
+        base_url = self.stub_options.get("base_url")
+        if base_url is None:
+            from agent.stub_config import StubConfig
+            from agent.stub_server import shared_server
+            base_url = shared_server(StubConfig.from_dict(self.stub_options)).base_url
+
+        return ChatOpenAI(
+            model=self.llm_settings["model"],
+            base_url=base_url,
+            api_key="not-needed",
+            temperature=self.llm_settings["temperature"],
+            max_retries=0,
+        )
+
     # Define the base prompt template used by the agent
     def _build_prompt(self):
-        return ChatPromptTemplate.from_messages([
-            ("system", "{system_prompt}"),
-            ("system", "You must follow these user preferences in all responses:\n{memory}"),
-            ("user", "{user_input}")
-        ])
+        from langchain_core.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_messages(list(PROMPT_MESSAGES))
+
+    @staticmethod
+    def _format_memory(memory) -> str:
+        return "\n".join(memory) if memory else "None"
 
     # Create the runnable chain: format inputs, apply prompt, call LLM
     def _build_executor(self):
+        from langchain_core.runnables import RunnableLambda
+
         return (
             {
                 "system_prompt": RunnableLambda(lambda x: x["system_prompt"]),
-                "memory": RunnableLambda(lambda x: "\n".join(x["memory"]) if x.get("memory") else "None"),
+                "memory": RunnableLambda(lambda x: AgentRunner._format_memory(x.get("memory"))),
                 "user_input": RunnableLambda(lambda x: x["user_input"]),
             }
             | self.prompt
@@ -71,51 +203,255 @@ class AgentRunner:
     def reset_session(self) -> None:
         self.session_memory = []
 
-    # Inject an attack into the agent
-    def inject_attack(self, context: AgentContext, attack: Attack) -> Dict[str, Any]:
+    # Inject one attack, or a list of attacks, into the agent
+    # For a list, the triggered attacks are found in one pass with a TriggerMatcher
+    # (pass a prebuilt matcher to reuse it across contexts) and injected in list order
+    def inject_attack(self, context: AgentContext, attack: Union[Attack, Sequence[Attack], None] = None,
+                      matcher: Optional[TriggerMatcher] = None) -> Dict[str, Any]:
         context_dict = context.to_dict()
 
-        # Apply attack injection if trigger condition is met
-        did_trigger = False
-        if attack.should_trigger(context_dict):
-            did_trigger = True
-            context_dict = attack.inject(context_dict)
-
-            # Persist memory if scope is set
-            if attack.scope == PoisoningScope.PERSISTENT:
-                persisted = attack.persist_longterm()
-                if persisted:
-                    self.persistent_memory.add_entry(
-                        persisted["key"],
-                        persisted["value"],
-                        persisted.get("source", "benign")
-                    )
-            elif attack.scope == PoisoningScope.SESSION:
-                val = attack.persist_session()
-                if val: self.session_memory.append(val)
+        if isinstance(attack, Attack):
+            # Apply attack injection if trigger condition is met
+            did_trigger = attack.should_trigger(context_dict)
+            if did_trigger:
+                self._apply_attack(context_dict, attack)
+            return {
+                "did_trigger": did_trigger,
+                "attack": attack.metadata(),
+            }
+
+        if matcher is None:
+            matcher = TriggerMatcher(attack or [])
+        triggered = set(matcher.match_indices(context_dict))
+        for i in sorted(triggered):
+            context_dict = self._apply_attack(context_dict, matcher.attacks[i])
 
         return {
-            "did_trigger": did_trigger,
-            "attack": attack.metadata(),
+            "did_trigger": bool(triggered),
+            "attacks": [
+                {"did_trigger": i in triggered, "attack": a.metadata()}
+                for i, a in enumerate(matcher.attacks)
+            ],
         }
 
-    def run(self, context: AgentContext) -> Tuple[str, Dict[str, Any]]:
-        context = context.to_dict()
+    # Inject a triggered attack into the context and persist what its scope asks for
+    def _apply_attack(self, context_dict: Dict[str, Any], attack: Attack) -> Dict[str, Any]:
+        context_dict = attack.inject(context_dict)
 
-        # Load persistent memory (values) based on retrieval mode and append to current memory
-        persistent_values = self.persistent_memory.retrieve(
-            mode=self.retrieval_mode,
-            k=self.retrieval_k,
-            key=self.retrieval_key
-        )
+        # Persist memory if scope is set
+        if attack.scope == PoisoningScope.PERSISTENT:
+            persisted = attack.persist_longterm()
+            if persisted:
+                self.persistent_memory.add_entry(
+                    persisted["key"],
+                    persisted["value"],
+                    persisted.get("source", "benign")
+                )
+        elif attack.scope == PoisoningScope.SESSION:
+            # Copy-on-write, so memory views built for earlier runs never change under them
+            val = attack.persist_session()
+            if val: self.session_memory = self.session_memory + [val]
+
+        return context_dict
+
+    # Build the prompt inputs for a context: a view over its own memory, the
+    # retrieved persistent values and the current session memory (nothing is copied)
+    def _prepare(self, context: AgentContext, spans: SpanRecorder = NULL_SPANS) -> Dict[str, Any]:
+        # Load persistent memory (values) based on retrieval mode
+        with spans.span("retrieve"):
+            persistent_values = self.persistent_memory.retrieve(
+                mode=self.retrieval_mode,
+                k=self.retrieval_k,
+                key=self.retrieval_key,
+                query=context.user_input
+            )
+
+        return {
+            "system_prompt": context.system_prompt,
+            "user_input": context.user_input,
+            "memory": MemoryView(context.memory, persistent_values, self.session_memory),
+        }
+
+    # Render the prompt for the prepared inputs, plus its response cache key
+    # (None when caching is off). The runner drives the prompt and the LLM as two
+    # steps instead of through the executor chain so each can be timed on its own
+    def _render(self, inputs: Dict[str, Any], spans: SpanRecorder = NULL_SPANS) -> Tuple[Any, Optional[str]]:
+        with spans.span("render"):
+            prompt_value = self.prompt.invoke({
+                "system_prompt": inputs["system_prompt"],
+                "memory": self._format_memory(inputs.get("memory")),
+                "user_input": inputs["user_input"],
+            })
+
+            key = None
+            if self.response_cache is not None:
+                key = ResponseCache.make_key(self.llm_settings, prompt_value.to_messages())
+        return prompt_value, key
+
+    # Output token count reported by the model, or a whitespace count when it reports none
+    @staticmethod
+    def _output_tokens(response, output: str) -> int:
+        usage = getattr(response, "usage_metadata", None)
+        if usage and usage.get("output_tokens") is not None:
+            return usage["output_tokens"]
+        return len(output.split())
+
+    def run(self, context: AgentContext, spans: SpanRecorder = NULL_SPANS) -> str:
+        inputs = self._prepare(context, spans)
+        prompt_value, key = self._render(inputs, spans)
+
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        with spans.span("llm"):
+            if self.call_controller is None:
+                response = self.llm.invoke(prompt_value)
+            else:
+                response = self.call_controller.call(lambda: self.llm.invoke(prompt_value))
+        output = self._chunk_text(response)
+        if spans.enabled:
+            spans.output_tokens = self._output_tokens(response, output)
+
+        if key is not None:
+            self.response_cache.put(key, output)
+        return output
 
-        if persistent_values:
-            context["memory"] = context["memory"] + persistent_values
+    async def arun(self, context: AgentContext, spans: SpanRecorder = NULL_SPANS) -> str:
+        inputs = self._prepare(context, spans)
+        prompt_value, key = self._render(inputs, spans)
 
-        if self.session_memory:
-            context["memory"] = context["memory"] + self.session_memory
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
 
-        output = str(self.executor.invoke(context))
+        with spans.span("llm"):
+            if self.call_controller is None:
+                response = await self.llm.ainvoke(prompt_value)
+            else:
+                response = await self.call_controller.acall(lambda: self.llm.ainvoke(prompt_value))
+        output = self._chunk_text(response)
+        if spans.enabled:
+            spans.output_tokens = self._output_tokens(response, output)
 
+        if key is not None:
+            self.response_cache.put(key, output)
         return output
-     
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        return chunk if isinstance(chunk, str) else str(chunk.content)
+
+    # Look up a cached output for streaming runs; a hit is judged in one piece
+    def _cached_stream_result(self, key: Optional[str], attack: Attack,
+                              spans: SpanRecorder = NULL_SPANS) -> Optional[Tuple[str, bool, bool]]:
+        if key is None:
+            return None
+        cached = self.response_cache.get(key)
+        if cached is None:
+            return None
+        with spans.span("detect"):
+            detector = attack.success_detector()
+            detector.feed(cached)
+            success = detector.finish()
+        return cached, success, False
+
+    # Stream the LLM output into attack's incremental detector and stop generating
+    # as soon as the verdict is final or max_tokens chunks have arrived
+    # Returns (output so far, success, stopped_early); truncated outputs are never cached
+    # Detection runs interleaved with generation, so its time is part of the "llm" span
+    def run_stream(self, context: AgentContext, attack: Attack, max_tokens: Optional[int] = None,
+                   spans: SpanRecorder = NULL_SPANS) -> Tuple[str, bool, bool]:
+        inputs = self._prepare(context, spans)
+        prompt_value, key = self._render(inputs, spans)
+        cached = self._cached_stream_result(key, attack, spans)
+        if cached is not None:
+            return cached
+
+        detector = attack.success_detector()
+        chunks = []
+        stopped_early = False
+
+        with spans.span("llm"):
+            if self.call_controller is None:
+                stream = self.llm.stream(prompt_value)
+            else:
+                stream = self.call_controller.stream(lambda: self.llm.stream(prompt_value))
+            try:
+                for chunk in stream:
+                    chunks.append(self._chunk_text(chunk))
+                    verdict = detector.feed(chunks[-1])
+                    if verdict is not None or (max_tokens is not None and len(chunks) >= max_tokens):
+                        stopped_early = True
+                        break
+            finally:
+                # Closing the stream drops the connection, which cancels generation server-side
+                stream.close()
+        spans.output_tokens = len(chunks)
+
+        output = "".join(chunks)
+        if key is not None and not stopped_early:
+            self.response_cache.put(key, output)
+        return output, detector.finish(), stopped_early
+
+    async def arun_stream(self, context: AgentContext, attack: Attack, max_tokens: Optional[int] = None,
+                          spans: SpanRecorder = NULL_SPANS) -> Tuple[str, bool, bool]:
+        inputs = self._prepare(context, spans)
+        prompt_value, key = self._render(inputs, spans)
+        cached = self._cached_stream_result(key, attack, spans)
+        if cached is not None:
+            return cached
+
+        detector = attack.success_detector()
+        chunks = []
+        stopped_early = False
+
+        with spans.span("llm"):
+            if self.call_controller is None:
+                stream = self.llm.astream(prompt_value)
+            else:
+                stream = self.call_controller.astream(lambda: self.llm.astream(prompt_value))
+            try:
+                async for chunk in stream:
+                    chunks.append(self._chunk_text(chunk))
+                    verdict = detector.feed(chunks[-1])
+                    if verdict is not None or (max_tokens is not None and len(chunks) >= max_tokens):
+                        stopped_early = True
+                        break
+            finally:
+                await stream.aclose()
+        spans.output_tokens = len(chunks)
+
+        output = "".join(chunks)
+        if key is not None and not stopped_early:
+            self.response_cache.put(key, output)
+        return output, detector.finish(), stopped_early
+
+    # Await run_one for every context with at most max_concurrency in flight
+    # Results are returned in the same order as contexts
+    @staticmethod
+    async def gather_limited(run_one, contexts: List[AgentContext], max_concurrency: int) -> List[Any]:
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def limited(context: AgentContext):
+            async with semaphore:
+                return await run_one(context)
+
+        return await asyncio.gather(*(limited(c) for c in contexts))
+
+    # Run many contexts concurrently against the LLM
+    async def abatch(self, contexts: List[AgentContext], max_concurrency: int = 8) -> List[str]:
+        return await self.gather_limited(self.arun, contexts, max_concurrency)
+
+    # Streaming counterpart of abatch, returning run_stream tuples
+    async def abatch_stream(self, contexts: List[AgentContext], attack: Attack, max_concurrency: int = 8,
+                            max_tokens: Optional[int] = None) -> List[Tuple[str, bool, bool]]:
+        return await self.gather_limited(
+            lambda c: self.arun_stream(c, attack, max_tokens=max_tokens),
+            contexts,
+            max_concurrency
+        )
@@ -0,0 +1,411 @@
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+# Client-side control of LLM calls: an AIMD limit on how many calls are in flight
+# and retries with jittered exponential backoff. One CallController is shared by
+# every AgentRunner of an experiment, across threads or on the event loop
+
+# HTTP statuses worth retrying, and those that mean the server is overloaded
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+OVERLOAD_STATUSES = {429, 503}
+
+# Client errors (openai's) that are retried though they carry no status
+RETRY_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+# A call that still failed after its retries; the last attempt's error is its __cause__
+class CallFailedError(Exception):
+    pass
+
+def _status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+# Retry transient failures with "full jitter" backoff: attempt n waits a uniform
+# random time in [0, min(max_delay, base_delay * 2^n)], so clients that failed
+# together do not come back together. A server's Retry-After is honored as a minimum
+class RetryPolicy:
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 20.0,
+                 seed: Optional[int] = None):
+        if max_retries < 0 or base_delay < 0 or max_delay < 0:
+            raise ValueError("Retry settings must not be negative")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = random.Random(seed)
+
+    def retryable(self, error: BaseException) -> bool:
+        status = _status(error)
+        if status is not None:
+            return status in RETRY_STATUSES
+        return isinstance(error, (ConnectionError, TimeoutError)) or \
+            any(cls.__name__ in RETRY_ERROR_NAMES for cls in type(error).__mro__)
+
+    # Seconds to wait before retry number attempt + 1
+    def delay(self, attempt: int, error: BaseException) -> float:
+        backoff = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + self._rng.uniform(0, self.base_delay)
+        return backoff
+
+# AIMDLimiter caps the calls in flight at a limit it adjusts from what it observes,
+# like TCP congestion control:
+#   additive increase        each call that finishes while the limit was fully used
+#                            adds 1/limit, so the limit grows by about 1 per round trip
+#   multiplicative decrease  an error, or a smoothed latency above tolerance times the
+#                            uncongested baseline, multiplies the limit by backoff; at
+#                            most once per round trip, so one burst of slow calls
+#                            counts as one congestion signal
+# The baseline is the lowest smoothed latency seen. It is re-measured when it has not
+# been lowered for BASELINE_PROBE_S: new calls wait until those in flight are done,
+# then PROBE_CALLS calls run at min_limit and their lowest latency is the new
+# baseline (like BBR's min-RTT probe). So the baseline follows a server that gets
+# slower for good, but never a queue that builds up in front of it: a baseline that
+# crept up on its own would catch up with steady queueing and lose the signal.
+# Latency only counts as congestion once it is also LATENCY_SLACK_S above the
+# baseline, so jitter on near-instant calls (e.g. the fake LLM) is not mistaken for it
+BASELINE_PROBE_S = 10.0
+PROBE_CALLS = 3
+LATENCY_SLACK_S = 0.005
+
+class AIMDLimiter:
+    # clock gives the time in seconds that baseline probes are scheduled by
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[float] = None,
+                 backoff: float = 0.7, tolerance: float = 2.0, smoothing: float = 0.2,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_limit < 1 or not 1 <= min_limit <= max_limit:
+            raise ValueError(f"Need 1 <= min_limit <= max_limit, got {min_limit} and {max_limit}")
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be in (0, 1), got {backoff}")
+
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(min(max_limit, max(min_limit, initial if initial is not None else 4)))
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._waiters: List[Any] = []
+        self._in_flight = 0
+        self._completed = 0
+        self._last_decrease = 0
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self.decreases = 0
+
+        # Probe state: _probe_calls is None unless probing; _probe_draining counts the
+        # calls from before the probe that are still in flight
+        self._probe_at = 0.0
+        self._probe_calls: Optional[int] = None
+        self._probe_draining = 0
+        self._probe_min: Optional[float] = None
+        self.probes = 0
+
+    def _permits(self) -> int:
+        if self._probe_calls is not None:
+            return 0 if self._probe_draining else self.min_limit
+        return max(self.min_limit, int(self.limit))
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self._permits():
+                self._cond.wait()
+            self._in_flight += 1
+
+    # Async acquire for calls on an event loop; waiters are woken by release
+    async def aacquire(self) -> None:
+        import asyncio
+
+        while True:
+            with self._cond:
+                if self._in_flight < self._permits():
+                    self._in_flight += 1
+                    return
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            await waiter
+
+    # Finish a call: latency in seconds, congested if it failed from overload or timed out
+    # A latency of None (e.g. a cancelled call) frees the slot without being observed
+    def release(self, latency: Optional[float], congested: bool = False) -> None:
+        with self._cond:
+            if latency is not None:
+                self._observe(latency, congested)
+            self._in_flight -= 1
+            self._probe(None if congested else latency)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def _observe(self, latency: float, congested: bool) -> None:
+        self._completed += 1
+
+        if not congested:
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += self.smoothing * (latency - self._latency)
+            if self._baseline is None or self._latency < self._baseline:
+                self._baseline = self._latency
+                self._probe_at = self._clock() + BASELINE_PROBE_S
+            congested = self._latency > self.tolerance * self._baseline and \
+                self._latency - self._baseline > LATENCY_SLACK_S
+
+        if congested:
+            if self._completed - self._last_decrease >= self.limit:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = self._completed
+                self.decreases += 1
+        elif self._probe_calls is None and self._in_flight >= self._permits():
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    # Start a baseline probe when one is due, or count a call that finished during one;
+    # latency is None for calls that tell nothing about the uncongested latency
+    def _probe(self, latency: Optional[float]) -> None:
+        if self._probe_calls is None:
+            if self._baseline is not None and self._clock() >= self._probe_at:
+                self._probe_calls = PROBE_CALLS
+                self._probe_draining = self._in_flight
+                self._probe_min = None
+                self.probes += 1
+            return
+
+        if self._probe_draining:
+            self._probe_draining -= 1
+            return
+        if latency is not None:
+            self._probe_min = latency if self._probe_min is None else min(self._probe_min, latency)
+            self._probe_calls -= 1
+        if self._probe_calls == 0:
+            self._baseline = self._probe_min
+            self._probe_calls = None
+            self._probe_at = self._clock() + BASELINE_PROBE_S
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "decreases": self.decreases,
+                "probes": self.probes,
+                "latency_s": self._latency,
+                "baseline_latency_s": self._baseline,
+            }
+
+def _wake(waiter) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+# CallController runs LLM calls through an optional AIMDLimiter and a RetryPolicy
+# and counts what happened:
+#   calls     calls made (each counted once, however many attempts it took)
+#   attempts  requests sent, including retries
+#   retries   attempts after the first
+#   rejected  attempts the server turned away as overloaded (429/503)
+#   errors    failed attempts of any kind
+#   failed    calls that still failed after their retries (they raise CallFailedError)
+#   busy_s    wall time with at least one call in flight
+class CallController:
+    def __init__(self, limiter: Optional[AIMDLimiter] = None, retry: Optional[RetryPolicy] = None):
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy()
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "attempts": 0, "retries": 0, "rejected": 0, "errors": 0, "failed": 0}
+        self._active = 0
+        self._busy_since = 0.0
+        self._busy_s = 0.0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _start(self) -> float:
+        now = time.perf_counter()
+        with self._lock:
+            self._counts["attempts"] += 1
+            if self._active == 0:
+                self._busy_since = now
+            self._active += 1
+        return now
+
+    # Record an attempt that ended; error is None if it succeeded
+    # The limiter observes the time to first_at (a stream's first chunk) or to now;
+    # with observe=False (e.g. a cancelled call) it only gets the slot back
+    def _finish(self, start: float, error: Optional[BaseException],
+                first_at: Optional[float] = None, observe: bool = True) -> None:
+        now = time.perf_counter()
+        latency = (first_at or now) - start if observe else None
+        congested = False
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._busy_s += now - self._busy_since
+            if error is not None:
+                self._counts["errors"] += 1
+                status = _status(error)
+                if status in OVERLOAD_STATUSES:
+                    self._counts["rejected"] += 1
+                congested = status in OVERLOAD_STATUSES or status in (408, 504) or \
+                    isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError"
+        if self.limiter is not None:
+            self.limiter.release(latency, congested)
+
+    # Whether a failed attempt is retried
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        if attempt < self.retry.max_retries and self.retry.retryable(error):
+            self._count("retries")
+            return True
+        self._count("failed")
+        return False
+
+    @staticmethod
+    def _failed(error: BaseException, attempt: int) -> CallFailedError:
+        return CallFailedError(f"LLM call failed after {attempt + 1} attempt(s): {type(error).__name__}: {error}")
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = self._start()
+            try:
+                result = fn()
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # Interrupted or cancelled: free the slot and stop
+                    self._finish(start, None, observe=False)
+                    raise
+                self._finish(start, e)
+                if not self._should_retry(e, attempt):
+                    raise self._failed(e, attempt) from e
+                time.sleep(self.retry.delay(attempt, e))
+                attempt += 1
+                continue
+            self._finish(start, None)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        import asyncio
+
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.aacquire()
+            start = self._start()
+            try:
+                result = await fn()
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # Interrupted or cancelled: free the slot and stop
+                    self._finish(start, None, observe=False)
+                    raise
+                self._finish(start, e)
+                if not self._should_retry(e, attempt):
+                    raise self._failed(e, attempt) from e
+                await asyncio.sleep(self.retry.delay(attempt, e))
+                attempt += 1
+                continue
+            self._finish(start, None)
+            return result
+
+    # Stream the chunks of open_stream() under the limiter. A stream is retried only
+    # if it fails before its first chunk; the limiter sees its time to first chunk.
+    # Closing this generator (early stopping) closes the underlying stream
+    def stream(self, open_stream: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = self._start()
+            first_at = None
+            error = None
+            stream = None
+            try:
+                # Opening the stream can fail too (e.g. a refused connection); it is
+                # retried like a failure before the first chunk
+                stream = open_stream()
+                for chunk in stream:
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                if first_at is not None:
+                    self._count("failed")
+                    raise self._failed(e, attempt) from e
+                if not self._should_retry(e, attempt):
+                    raise self._failed(e, attempt) from e
+            finally:
+                if stream is not None:
+                    stream.close()
+                # A stream closed before its first chunk tells nothing about latency
+                self._finish(start, error, first_at, observe=first_at is not None or error is not None)
+            time.sleep(self.retry.delay(attempt, error))
+            attempt += 1
+
+    async def astream(self, open_stream: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        import asyncio
+
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.aacquire()
+            start = self._start()
+            first_at = None
+            error = None
+            stream = None
+            try:
+                # Opening the stream can fail too (e.g. a refused connection); it is
+                # retried like a failure before the first chunk
+                stream = open_stream()
+                async for chunk in stream:
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                if first_at is not None:
+                    self._count("failed")
+                    raise self._failed(e, attempt) from e
+                if not self._should_retry(e, attempt):
+                    raise self._failed(e, attempt) from e
+            finally:
+                if stream is not None:
+                    await stream.aclose()
+                # A stream closed before its first chunk tells nothing about latency
+                self._finish(start, error, first_at, observe=first_at is not None or error is not None)
+            await asyncio.sleep(self.retry.delay(attempt, error))
+            attempt += 1
+
+    # Cumulative counters plus the limiter's state; callers diff two snapshots per run
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            busy_s = self._busy_s + (time.perf_counter() - self._busy_since if self._active else 0.0)
+        stats["busy_s"] = busy_s
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        return stats
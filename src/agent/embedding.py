@@ -0,0 +1,172 @@
+import re
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Buckets of the hashed n-gram space
+DEFAULT_DIM = 2 ** 18
+
+# A sparse vector: sorted distinct bucket ids (int32) and their weights (float32)
+SparseVector = Tuple[np.ndarray, np.ndarray]
+
+# Postings (per-bucket lists of rows) are rebuilt once this many rows were appended
+# since the last build, or 1/SEAL_FRACTION of the indexed rows if that is more;
+# rows in between are scanned directly
+SEAL_MIN_ROWS = 256
+SEAL_FRACTION = 256
+
+# HashedTfidfEmbedder maps text to a sparse vector of hashed character n-grams.
+# The hash space is large enough that unrelated n-grams rarely share a bucket, so
+# an entry only has a few dozen non-zero buckets out of dim.
+# It is fully local and deterministic across processes (crc32, not hash())
+class HashedTfidfEmbedder:
+    def __init__(self, dim: int = DEFAULT_DIM, ngram_sizes: tuple = (3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    # Hash every character n-gram of every (padded) word into a bucket
+    def buckets(self, text: str) -> List[int]:
+        out = []
+        for word in _TOKEN_RE.findall(text.lower()):
+            padded = f" {word} "
+            for n in self.ngram_sizes:
+                for i in range(max(1, len(padded) - n + 1)):
+                    out.append(zlib.crc32(padded[i:i + n].encode("utf-8")) % self.dim)
+        return out
+
+    # Sublinear term frequency of each distinct bucket, L2-normalized
+    def embed(self, text: str) -> SparseVector:
+        buckets = self.buckets(text)
+        if not buckets:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        ids, counts = np.unique(np.asarray(buckets, dtype=np.int32), return_counts=True)
+        weights = (1.0 + np.log(counts)).astype(np.float32)
+        weights /= np.linalg.norm(weights)
+        return ids, weights
+
+# Inverted index of the first count rows of a CSR matrix (row i has buckets
+# row_buckets[row_offsets[i]:row_offsets[i + 1]]): for every bucket b, the rows that
+# have it are rows[offsets[b]:offsets[b + 1]], ascending, with their weights
+def build_postings(dim: int, row_offsets: np.ndarray, row_buckets: np.ndarray,
+                   row_weights: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = int(row_offsets[count])
+    buckets = np.asarray(row_buckets[:n])
+    order = np.argsort(buckets, kind="stable")
+    rows = np.repeat(np.arange(count, dtype=np.int32), np.diff(row_offsets[:count + 1]))[order]
+    weights = np.asarray(row_weights[:n])[order]
+    offsets = np.zeros(dim + 1, dtype=np.int64)
+    np.cumsum(np.bincount(buckets, minlength=dim), out=offsets[1:])
+    return offsets, rows, weights
+
+# Whether the rows appended after the first sealed ones are worth a postings rebuild
+def needs_seal(sealed: int, count: int) -> bool:
+    return count - sealed > max(SEAL_MIN_ROWS, sealed // SEAL_FRACTION)
+
+# Rank the rows of a CSR matrix against a query vector. Rows [0, sealed) are scored
+# through their postings, so a query only reads the rows that share a bucket with it;
+# rows [sealed, count) are scanned. IDF is applied on the query side only, so stored
+# rows never need re-weighting as document frequencies change.
+# Returns the indices of up to k rows with a positive score, best first
+def search_rows(query: SparseVector, k: int, count: int, row_offsets: np.ndarray,
+                row_buckets: np.ndarray, row_weights: np.ndarray,
+                postings: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]], sealed: int) -> List[int]:
+    query_ids, query_weights = query
+    if k <= 0 or count == 0 or len(query_ids) == 0:
+        return []
+
+    if postings is not None and sealed > 0:
+        post_offsets, post_rows, post_weights = postings
+        starts = post_offsets[query_ids]
+        ends = post_offsets[query_ids + 1]
+    else:
+        sealed = 0
+        starts = ends = np.zeros(len(query_ids), dtype=np.int64)
+    df = (ends - starts).astype(np.float64)
+
+    # Unsealed rows: the query slot of each of their buckets, found by binary search
+    # in the sorted query ids (hit is False where the bucket is not in the query)
+    tail_start, tail_end = int(row_offsets[sealed]), int(row_offsets[count])
+    tail_buckets = row_buckets[tail_start:tail_end]
+    slot = np.minimum(np.searchsorted(query_ids, tail_buckets), len(query_ids) - 1)
+    hit = query_ids[slot] == tail_buckets
+    df += np.bincount(slot[hit], minlength=len(query_ids))
+
+    q = query_weights * idf_weight(count, df) ** 2
+
+    rows, scores = [], []
+    for start, end, weight in zip(starts.tolist(), ends.tolist(), q.tolist()):
+        if end > start:
+            rows.append(post_rows[start:end])
+            scores.append(post_weights[start:end] * weight)
+    if hit.any():
+        tail_rows = np.repeat(np.arange(sealed, count), np.diff(row_offsets[sealed:count + 1]))
+        rows.append(tail_rows[hit])
+        scores.append(np.asarray(row_weights[tail_start:tail_end])[hit] * q[slot[hit]])
+    if not rows:
+        return []
+
+    totals = np.bincount(np.concatenate(rows), weights=np.concatenate(scores), minlength=count)
+    return [i for i in top_k_indices(totals, k) if totals[i] > 0]
+
+# VectorIndex keeps entry vectors as a growable CSR matrix (bucket ids and weights
+# in preallocated arrays that grow by doubling), so adding an entry is amortized
+# O(its n-grams) and never re-embeds the rest. Searches go through postings that
+# are rebuilt lazily once enough entries were added since the last build
+class VectorIndex:
+    def __init__(self, embedder: HashedTfidfEmbedder = None, capacity: int = 1024):
+        self.embedder = embedder if embedder is not None else HashedTfidfEmbedder()
+        self.count = 0
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._buckets = np.zeros(capacity * 64, dtype=np.int32)
+        self._weights = np.zeros(capacity * 64, dtype=np.float32)
+        self._postings = None
+        self._sealed = 0
+
+    def add(self, text: str) -> None:
+        ids, weights = self.embedder.embed(text)
+        start = int(self._offsets[self.count])
+        end = start + len(ids)
+
+        if self.count + 1 == len(self._offsets):
+            self._offsets = np.concatenate([self._offsets, np.zeros(len(self._offsets) - 1, dtype=np.int64)])
+        if end > len(self._buckets):
+            size = max(end, 2 * len(self._buckets))
+            self._buckets = np.concatenate([self._buckets, np.zeros(size - len(self._buckets), dtype=np.int32)])
+            self._weights = np.concatenate([self._weights, np.zeros(size - len(self._weights), dtype=np.float32)])
+
+        self._buckets[start:end] = ids
+        self._weights[start:end] = weights
+        self.count += 1
+        self._offsets[self.count] = end
+
+    def extend(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self.add(text)
+
+    # Return indices of the (up to) k entries most similar to query, best first;
+    # entries that share no n-gram bucket with the query are never returned
+    def search(self, query: str, k: int) -> List[int]:
+        if needs_seal(self._sealed, self.count):
+            self._postings = build_postings(self.embedder.dim, self._offsets, self._buckets,
+                                            self._weights, self.count)
+            self._sealed = self.count
+        return search_rows(self.embedder.embed(query), k, self.count, self._offsets,
+                           self._buckets, self._weights, self._postings, self._sealed)
+
+# Select the k highest scores without a full sort
+def top_k_indices(scores: np.ndarray, k: int) -> List[int]:
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return []
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order.tolist()
+
+def idf_weight(count: int, df: np.ndarray) -> np.ndarray:
+    return np.log((1.0 + count) / (1.0 + df)) + 1.0
@@ -0,0 +1,180 @@
+import json
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+from agent.memory_store import MemoryStore
+
+# JsonlMemoryStore keeps the MemoryStore API on top of an append-only JSONL log.
+# Every write appends one record, and an in-process index of live entries is
+# refreshed only when the file has changed since it was last read
+class JsonlMemoryStore(MemoryStore):
+    def __init__(self, path: str = "persistent_memory.jsonl", compact_every: int = 1000):
+        super().__init__(path=path)
+        self.compact_every = compact_every
+
+        self._entries: List[Dict[str, str]] = []
+        self._by_key: Dict[str, List[int]] = {}
+        self._dead = 0
+        self._offset = 0
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._generation = 0
+        self._values: List[str] = []
+
+    # Identify the file on disk so rewrites (new inode) and truncations are noticed
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _clear_index(self) -> None:
+        self._entries = []
+        self._values = []
+        self._generation += 1
+        self._by_key = {}
+        self._dead = 0
+        self._offset = 0
+
+    def _index_entry(self, entry: Dict[str, str]) -> None:
+        self._by_key.setdefault(entry.get("key"), []).append(len(self._entries))
+        self._entries.append(entry)
+        self._values.append(entry.get("value") or "")
+
+    def _rebuild_key_index(self) -> None:
+        self._by_key = {}
+        self._values = []
+        self._generation += 1
+        for i, e in enumerate(self._entries):
+            self._by_key.setdefault(e.get("key"), []).append(i)
+            self._values.append(e.get("value") or "")
+
+    # Apply a single log record to the in-memory index
+    def _apply(self, record: Dict[str, str]) -> None:
+        op = record.get("op", "add")
+
+        if op == "add":
+            self._index_entry({
+                "key": record.get("key"),
+                "value": record.get("value"),
+                "source": record.get("source"),
+            })
+        elif op == "reset_poison":
+            before = len(self._entries)
+            self._entries = [e for e in self._entries if e.get("source") == "benign"]
+            self._rebuild_key_index()
+            self._dead += before - len(self._entries) + 1
+        else:
+            raise ValueError(f"Unknown memory log op: {op}")
+
+    # Bring the index up to date with the file, reading only newly appended bytes
+    def _refresh(self) -> None:
+        with self._index_lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+
+        if stamp is None:
+            self._clear_index()
+            self._stamp = None
+            return
+
+        inode, size, _ = stamp
+        if self._stamp is None or self._stamp[0] != inode or size < self._offset:
+            self._clear_index()
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                # A partially written trailing line is picked up on the next refresh
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                if line.strip():
+                    self._apply(json.loads(line))
+
+        # The stamp from before the read: anything appended since changes the file's
+        # stamp, so the next refresh picks it up from _offset
+        self._stamp = stamp
+
+    def _append(self, record: Dict[str, str]) -> None:
+        with self._index_lock:
+            self._refresh()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self._refresh()
+
+        if self.compact_every and self._dead >= self.compact_every and self._dead > len(self._entries):
+            self.compact()
+
+    # Load all live memories (index is refreshed from disk if needed)
+    def load(self) -> List[Dict[str, str]]:
+        with self._index_lock:
+            self._refresh()
+            return list(self._entries)
+
+    # Overwrite memory store with given entries
+    def save(self, entries: List[Dict[str, str]]) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for e in entries:
+                f.write(json.dumps({
+                    "op": "add",
+                    "key": e.get("key"),
+                    "value": e.get("value"),
+                    "source": e.get("source"),
+                }) + "\n")
+        os.replace(tmp_path, self.path)
+        self._refresh()
+
+    # Rewrite the log with only live entries, dropping records removed by reset_poison
+    def compact(self) -> None:
+        self.save(self.load())
+
+    # Remove any malicious entries from memory by appending a tombstone record
+    def reset_poison(self) -> None:
+        self._append({"op": "reset_poison"})
+
+    # Add a (key, value) memory entry as a single appended record
+    def add_entry(self, key: str, value: str, source: str) -> None:
+        self._append({
+            "op": "add",
+            "key": key,
+            "value": value,
+            "source": source,
+        })
+
+    # Return memory values based on retrieval type, touching only the selected entries
+    def retrieve(self, mode: str = "all", k: Optional[int] = None, key: Optional[str] = None,
+                 query: Optional[str] = None) -> List[str]:
+        with self._index_lock:
+            self._refresh()
+            return self._retrieve_locked(mode, k, key, query)
+
+    def _retrieve_locked(self, mode: str, k: Optional[int], key: Optional[str],
+                         query: Optional[str]) -> List[str]:
+        entries = self._entries
+
+        if mode == "similarity":
+            if k is None or query is None: return []
+            ranked = self._rank_by_similarity(self._values, query, k, generation=self._generation)
+            return [v for v in ranked if v]
+        elif mode == "all":
+            selected = entries
+        elif mode == "top_k":
+            if k is None: return []
+            selected = entries[-k:] if k > 0 else []
+        elif mode == "by_key":
+            if key is None: return []
+            selected = [entries[i] for i in self._by_key.get(key, [])]
+        elif mode == "random":
+            if k is None or k <= 0: return []
+            selected = random.sample(entries, min(k, len(entries)))
+        else:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+
+        return [e.get("value", "") for e in selected if e.get("value")]
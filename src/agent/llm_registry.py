@@ -0,0 +1,27 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+# Process-wide registry of LLM components keyed by LLM settings.
+# Every AgentRunner with the same settings shares one (llm, prompt, executor), so
+# they reuse one HTTP client/connection pool and one compiled runnable chain;
+# only memory and session state stay per-runner
+_lock = threading.Lock()
+_components: Dict[str, Tuple[Any, Any, Any]] = {}
+
+def _registry_key(settings: Dict[str, Any]) -> str:
+    return json.dumps(settings, sort_keys=True)
+
+# Return the shared components for settings, building them on first use
+def shared_components(settings: Dict[str, Any],
+                      build: Callable[[], Tuple[Any, Any, Any]]) -> Tuple[Any, Any, Any]:
+    key = _registry_key(settings)
+    with _lock:
+        if key not in _components:
+            _components[key] = build()
+        return _components[key]
+
+# Drop all shared components (e.g. after the server at base_url was restarted)
+def clear() -> None:
+    with _lock:
+        _components.clear()
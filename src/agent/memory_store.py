@@ -2,11 +2,17 @@ import json
 import os
 from typing import List, Dict, Optional
 import random
+import threading
 
 # MemoryStore represents the interface to load/store persistent entries
 class MemoryStore:
     def __init__(self, path: str = "persistent_memory.json"):
         self.path = path
+        self._vectors = None
+        self._vector_values: List[str] = []
+        self._vector_generation = None
+        # Guards in-process indexes so one store can serve several evaluation threads
+        self._index_lock = threading.RLock()
     
     # Load all stored memories from disk
     def load(self) -> List[Dict[str,str]]:
@@ -42,20 +48,54 @@ class MemoryStore:
         })
         self.save(entries)
 
+    # Rank values against query using an incrementally maintained vector index
+    # New values appended since the last call are embedded; anything else forces a rebuild.
+    # Stores that know when their entries were rewritten pass a generation token to
+    # skip the prefix comparison
+    def _rank_by_similarity(self, values: List[str], query: str, k: int,
+                            generation: Optional[int] = None) -> List[str]:
+        from agent.embedding import VectorIndex
+
+        with self._index_lock:
+            n = self._vectors.count if self._vectors is not None else 0
+            if generation is not None:
+                unchanged = generation == self._vector_generation and len(values) >= n
+            else:
+                unchanged = values[:n] == self._vector_values
+
+            if self._vectors is None or not unchanged:
+                self._vectors = VectorIndex()
+                self._vector_values = []
+                n = 0
+
+            self._vectors.extend(values[n:])
+            if generation is None:
+                self._vector_values.extend(values[n:])
+            self._vector_generation = generation
+
+            return [values[i] for i in self._vectors.search(query, k)]
+
     # Return memory values based on retrieval type
-    def retrieve(self, mode: str = "all", k: Optional[int] = None, key: Optional[str] = None) -> List[str]:
+    # similarity mode ranks entries against query (the current user input)
+    def retrieve(self, mode: str = "all", k: Optional[int] = None, key: Optional[str] = None,
+                 query: Optional[str] = None) -> List[str]:
         entries = self.load()
 
+        if mode == "similarity":
+            if k is None or query is None: return []
+            values = [e.get("value", "") for e in entries]
+            return [v for v in self._rank_by_similarity(values, query, k) if v]
+
         if mode == "all":
             selected = entries
         elif mode == "top_k":
-            if k is None: return []
+            if k is None or k <= 0: return []
             selected = entries[-k:]
         elif mode == "by_key":
             if key is None: return []
             selected = [e for e in entries if e.get("key") == key]
         elif mode == "random":
-            if k is None: return []
+            if k is None or k <= 0: return []
             selected = random.sample(entries, min(k,len(entries)))
         else:
             raise ValueError(f"Unknown retrieval mode: {mode}")
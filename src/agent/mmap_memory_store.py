@@ -0,0 +1,269 @@
+import json
+import mmap
+import os
+import random
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from agent.embedding import DEFAULT_DIM, HashedTfidfEmbedder, build_postings, needs_seal, search_rows
+from agent.memory_store import MemoryStore
+
+_FIELDS = ("key", "value", "source")
+
+# MmapMemoryStore keeps entries on disk in a directory that every process maps
+# read-only, so many AgentRunner workers share one copy through the page cache:
+#   meta.json              count, embedding settings
+#   vectors.{idx,val}      int32 bucket ids and float32 weights of every entry's
+#                          sparse vector, back to back
+#   vectors.off            int64 offsets into them (count + 1 entries)
+#   postings.bin           inverted index of the first `sealed` entries: int64 bucket
+#                          offsets (dim + 1) and sealed, then int32 entry ids and
+#                          float32 weights per bucket
+#   {key,value,source}.bin utf-8 text blob per field
+#   {key,value,source}.off uint64 offsets into the blob (count + 1 entries)
+# Files only grow on add_entry, so readers pick up new entries by re-mapping when
+# meta.json changes; entries past the postings are scanned until add_entry rebuilds
+# them. postings.bin and rewrites (save/reset_poison) replace files atomically.
+# A single writer process is assumed
+class MmapMemoryStore(MemoryStore):
+    def __init__(self, path: str = "persistent_memory.mmap", dim: int = DEFAULT_DIM):
+        super().__init__(path=path)
+        os.makedirs(path, exist_ok=True)
+
+        self._meta_stamp = None
+        self.count = 0
+        if not os.path.exists(self._file("meta.json")):
+            self._write_files([], HashedTfidfEmbedder(dim=dim))
+        self._refresh()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # Re-map the files only if meta.json changed since the last look
+    def _refresh(self) -> None:
+        with self._index_lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        st = os.stat(self._file("meta.json"))
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == self._meta_stamp:
+            return
+
+        with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.count = meta["count"]
+        self.embedder = HashedTfidfEmbedder(dim=meta["dim"], ngram_sizes=tuple(meta["ngram_sizes"]))
+        self._vector_offsets = self._map_array("vectors.off", np.int64, (self.count + 1,))
+        nnz = int(self._vector_offsets[self.count])
+        self._vector_ids = self._map_array("vectors.idx", np.int32, (nnz,))
+        self._vector_weights = self._map_array("vectors.val", np.float32, (nnz,))
+        self._postings, self._sealed = self._map_postings()
+        self._offsets = {
+            field: self._map_array(f"{field}.off", np.uint64, (self.count + 1,))
+            for field in _FIELDS
+        }
+        self._blobs = {field: self._map_bytes(f"{field}.bin") for field in _FIELDS}
+        self._meta_stamp = stamp
+
+    def _map_array(self, name: str, dtype, shape) -> np.ndarray:
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+
+    # (offsets, entry ids, weights) and the number of entries they cover
+    # Postings rebuilt after meta.json was read cover entries this reader does not
+    # know yet; they are skipped (every entry is scanned) until the next refresh
+    def _map_postings(self):
+        blob = self._map_bytes("postings.bin")
+        dim = self.embedder.dim
+        header = np.frombuffer(blob, dtype=np.int64, count=dim + 2)
+        sealed = int(header[dim + 1])
+        if sealed > self.count:
+            return None, 0
+
+        nnz = int(header[dim])
+        start = 8 * (dim + 2)
+        ids = np.frombuffer(blob, dtype=np.int32, count=nnz, offset=start)
+        weights = np.frombuffer(blob, dtype=np.float32, count=nnz, offset=start + 4 * nnz)
+        return (header[:dim + 1], ids, weights), sealed
+
+    def _map_bytes(self, name: str):
+        if os.path.getsize(self._file(name)) == 0:
+            return b""
+        with open(self._file(name), "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _text(self, field: str, i: int) -> str:
+        offsets = self._offsets[field]
+        return self._blobs[field][int(offsets[i]):int(offsets[i + 1])].decode("utf-8")
+
+    def _entry(self, i: int) -> Dict[str, str]:
+        return {field: self._text(field, i) for field in _FIELDS}
+
+    def _write_meta(self, count: int, embedder: HashedTfidfEmbedder, suffix: str = "") -> None:
+        with open(self._file("meta.json" + suffix), "w", encoding="utf-8") as f:
+            json.dump({
+                "count": count,
+                "dim": embedder.dim,
+                "ngram_sizes": list(embedder.ngram_sizes),
+            }, f)
+
+    # Index the first count entries of the vectors files (with suffix) into postings.bin.tmp
+    def _write_postings(self, count: int, dim: int, suffix: str = "") -> None:
+        offsets = np.fromfile(self._file("vectors.off" + suffix), dtype=np.int64, count=count + 1)
+        nnz = int(offsets[count])
+        ids = np.fromfile(self._file("vectors.idx" + suffix), dtype=np.int32, count=nnz)
+        weights = np.fromfile(self._file("vectors.val" + suffix), dtype=np.float32, count=nnz)
+        post_offsets, post_ids, post_weights = build_postings(dim, offsets, ids, weights, count)
+
+        with open(self._file("postings.bin.tmp"), "wb") as f:
+            f.write(post_offsets.tobytes())
+            f.write(np.int64(count).tobytes())
+            f.write(post_ids.tobytes())
+            f.write(post_weights.tobytes())
+
+    # Write a complete set of files next to the live ones, then swap them in
+    def _write_files(self, entries: Iterable[Dict[str, str]], embedder: HashedTfidfEmbedder) -> None:
+        names = ["vectors.idx", "vectors.val", "vectors.off"] + \
+            [f"{field}.{ext}" for field in _FIELDS for ext in ("bin", "off")]
+        handles = {name: open(self._file(name + ".tmp"), "wb") for name in names}
+        ends = {field: 0 for field in _FIELDS}
+        nnz = 0
+        count = 0
+
+        try:
+            handles["vectors.off"].write(np.int64(0).tobytes())
+            for field in _FIELDS:
+                handles[f"{field}.off"].write(np.uint64(0).tobytes())
+
+            for e in entries:
+                ids, weights = embedder.embed(e.get("value") or "")
+                nnz += len(ids)
+                handles["vectors.idx"].write(ids.tobytes())
+                handles["vectors.val"].write(weights.tobytes())
+                handles["vectors.off"].write(np.int64(nnz).tobytes())
+
+                for field in _FIELDS:
+                    data = (e.get(field) or "").encode("utf-8")
+                    ends[field] += len(data)
+                    handles[f"{field}.bin"].write(data)
+                    handles[f"{field}.off"].write(np.uint64(ends[field]).tobytes())
+                count += 1
+        finally:
+            for h in handles.values():
+                h.close()
+
+        self._write_postings(count, embedder.dim, suffix=".tmp")
+        for name in names + ["postings.bin"]:
+            os.replace(self._file(name + ".tmp"), self._file(name))
+
+        self._write_meta(count, embedder, suffix=".tmp")
+        os.replace(self._file("meta.json.tmp"), self._file("meta.json"))
+
+    # Build a store at path from any iterable of entries (e.g. another store's load())
+    @classmethod
+    def build(cls, path: str, entries: Iterable[Dict[str, str]], dim: int = DEFAULT_DIM) -> "MmapMemoryStore":
+        store = cls(path=path, dim=dim)
+        store._write_files(entries, HashedTfidfEmbedder(dim=dim))
+        store._refresh()
+        return store
+
+    # Load all stored memories (decodes every entry; prefer retrieve for large stores)
+    def load(self) -> List[Dict[str, str]]:
+        self._refresh()
+        return [self._entry(i) for i in range(self.count)]
+
+    # Overwrite memory store with given entries
+    def save(self, entries: List[Dict[str, str]]) -> None:
+        self._refresh()
+        self._write_files(entries, self.embedder)
+        self._refresh()
+
+    # Remove any malicious entries from memory
+    def reset_poison(self) -> None:
+        self._refresh()
+        benign = (self._entry(i) for i in range(self.count) if self._text("source", i) == "benign")
+        self._write_files(benign, self.embedder)
+        self._refresh()
+
+    # Append one entry to every file, then publish it by bumping the count in meta.json
+    def add_entry(self, key: str, value: str, source: str) -> None:
+        self._refresh()
+        entry = {"key": key, "value": value, "source": source}
+
+        ids, weights = self.embedder.embed(value or "")
+        with open(self._file("vectors.idx"), "ab") as f:
+            f.write(ids.tobytes())
+        with open(self._file("vectors.val"), "ab") as f:
+            f.write(weights.tobytes())
+        with open(self._file("vectors.off"), "ab") as f:
+            f.write(np.int64(int(self._vector_offsets[self.count]) + len(ids)).tobytes())
+
+        for field in _FIELDS:
+            data = (entry[field] or "").encode("utf-8")
+            end = int(self._offsets[field][self.count]) + len(data)
+            with open(self._file(f"{field}.bin"), "ab") as f:
+                f.write(data)
+            with open(self._file(f"{field}.off"), "ab") as f:
+                f.write(np.uint64(end).tobytes())
+
+        # Re-index once enough entries were appended since postings.bin was built
+        if needs_seal(self._sealed, self.count + 1):
+            self._write_postings(self.count + 1, self.embedder.dim)
+            os.replace(self._file("postings.bin.tmp"), self._file("postings.bin"))
+
+        self._write_meta(self.count + 1, self.embedder, suffix=".tmp")
+        os.replace(self._file("meta.json.tmp"), self._file("meta.json"))
+        self._refresh()
+
+    # Indices of entries whose key equals key, found by scanning the mapped key blob
+    def _key_indices(self, key: str) -> List[int]:
+        blob = self._blobs["key"]
+        offsets = self._offsets["key"]
+        needle = key.encode("utf-8")
+        if not needle:
+            return [i for i in range(self.count) if offsets[i] == offsets[i + 1]]
+
+        positions = []
+        pos = blob.find(needle)
+        while pos != -1:
+            positions.append(pos)
+            pos = blob.find(needle, pos + 1)
+        if not positions:
+            return []
+
+        # Keep only hits that span exactly one whole key
+        starts = np.array(positions, dtype=np.uint64)
+        idx = np.searchsorted(offsets, starts, side="right") - 1
+        exact = (offsets[idx] == starts) & (offsets[idx + 1] == starts + np.uint64(len(needle)))
+        return idx[exact].tolist()
+
+    # Return memory values based on retrieval type, decoding only the selected entries
+    def retrieve(self, mode: str = "all", k: Optional[int] = None, key: Optional[str] = None,
+                 query: Optional[str] = None) -> List[str]:
+        self._refresh()
+
+        if mode == "all":
+            selected = range(self.count)
+        elif mode == "top_k":
+            if k is None: return []
+            selected = range(max(0, self.count - k), self.count)
+        elif mode == "by_key":
+            if key is None: return []
+            selected = self._key_indices(key)
+        elif mode == "random":
+            if k is None or k <= 0: return []
+            selected = random.sample(range(self.count), min(k, self.count))
+        elif mode == "similarity":
+            if k is None or query is None: return []
+            selected = search_rows(self.embedder.embed(query), k, self.count,
+                                   self._vector_offsets, self._vector_ids, self._vector_weights,
+                                   self._postings, self._sealed)
+        else:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+
+        values = (self._text("value", i) for i in selected)
+        return [v for v in values if v]
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# ResponseCache stores LLM outputs on disk keyed by a hash of everything that
+# determines the output: LLM settings (model, base_url, temperature) and the fully
+# rendered prompt messages. It is only sound for deterministic (temperature=0) models.
+# Total stored output size is bounded; least recently used entries are evicted first
+class ResponseCache:
+    def __init__(self, path: str = "response_cache.db", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " output TEXT,"
+                " size INTEGER,"
+                " last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._total_bytes = total
+
+    # Stable key for an LLM call
+    @staticmethod
+    def make_key(llm_settings: Dict[str, Any], messages: List[Any]) -> str:
+        payload = {
+            "llm": llm_settings,
+            "messages": [[m.type, m.content] for m in messages],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT output FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, output: str) -> None:
+        size = len(output.encode("utf-8"))
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, output, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, output, size, time.time())
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    # Drop least recently used entries until the cache is back under 90% of max_bytes
+    def _evict(self) -> None:
+        target = self.max_bytes * 0.9
+        doomed = []
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used")
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+# Phases timed for every eval row, in pipeline order
+PHASES = ("retrieve", "render", "llm", "detect", "write")
+
+# SpanHook receives every finished span, e.g. to forward it to a profiler or trace file
+# start is a time.perf_counter() value; attrs describe the row (eval_type, eval_index, label)
+class SpanHook:
+    def on_span(self, name: str, start: float, duration: float, attrs: Dict[str, Any]) -> None:
+        pass
+
+    # Called at the end of every ExperimentRunner.run
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+# TraceFileHook writes spans as Chrome trace events ("X" complete events, one per line),
+# viewable in chrome://tracing or Perfetto
+class TraceFileHook(SpanHook):
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write("[\n")
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def on_span(self, name: str, start: float, duration: float, attrs: Dict[str, Any]) -> None:
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": duration * 1e6,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": attrs,
+        }
+        line = json.dumps(event) + ",\n"
+        with self._lock:
+            self._f.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder: "SpanRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.recorder.add(self.name, self.start, time.perf_counter() - self.start)
+
+# SpanRecorder collects the phase durations of one eval row
+# Durations of a phase entered several times are summed
+class SpanRecorder:
+    enabled = True
+
+    def __init__(self, hooks: Sequence[SpanHook] = (), attrs: Optional[Dict[str, Any]] = None):
+        self.hooks = hooks
+        self.attrs = attrs or {}
+        self.durations: Dict[str, float] = {}
+        self.output_tokens: Optional[int] = None
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def add(self, name: str, start: float, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        for hook in self.hooks:
+            hook.on_span(name, start, duration, self.attrs)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+# Stand-in used when spans are disabled: span() hands back one shared no-op
+# context manager and nothing is timed or stored
+class _NullRecorder:
+    __slots__ = ()
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name: str) -> _NullSpan:
+        return self._span
+
+    def add(self, name: str, start: float, duration: float) -> None:
+        pass
+
+    @property
+    def output_tokens(self) -> Optional[int]:
+        return None
+
+    @output_tokens.setter
+    def output_tokens(self, value: Optional[int]) -> None:
+        pass
+
+NULL_SPANS = _NullRecorder()
+
+# SpanStats aggregates the rows of one run into per-phase latency percentiles and
+# output tokens per second of LLM time
+class SpanStats:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {name: [] for name in PHASES}
+        self.latencies: List[float] = []
+        self.output_tokens = 0
+        self.token_llm_time = 0.0
+
+    def add(self, spans: SpanRecorder, latency: float) -> None:
+        for name, duration in spans.durations.items():
+            self.samples.setdefault(name, []).append(duration)
+        self.latencies.append(latency)
+        if spans.output_tokens is not None and "llm" in spans.durations:
+            self.output_tokens += spans.output_tokens
+            self.token_llm_time += spans.durations["llm"]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "spans": {name: percentiles(values) for name, values in self.samples.items() if values},
+            "latency": percentiles(self.latencies),
+            "tokens_per_s": self.output_tokens / self.token_llm_time if self.token_llm_time > 0 else None,
+        }
+
+# Nearest-rank percentiles of values, keyed "p50", "p95", ...
+def percentiles(values: List[float], qs: Sequence[int] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{q}": None for q in qs}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {f"p{q}": ordered[min(n - 1, max(0, -(-q * n // 100) - 1))] for q in qs}
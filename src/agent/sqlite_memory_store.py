@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from agent.memory_store import MemoryStore
+
+# SqliteMemoryStore keeps the MemoryStore API on top of a SQLite database so several
+# experiment processes can share one persistent memory. WAL mode lets readers run
+# alongside a single writer, and key/source indexes back by_key and reset_poison
+class SqliteMemoryStore(MemoryStore):
+    def __init__(self, path: str = "persistent_memory.db", timeout: float = 30.0):
+        super().__init__(path=path)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._indexed_values: List[str] = []
+        self._generation = 0
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT,"
+                " value TEXT,"
+                " source TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_key ON entries(key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_source ON entries(source)")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # Load all stored memories in insertion order
+    def load(self) -> List[Dict[str, str]]:
+        rows = self._query("SELECT key, value, source FROM entries ORDER BY id")
+        return [{"key": k, "value": v, "source": s} for k, v, s in rows]
+
+    # Overwrite memory store with given entries in a single transaction
+    def save(self, entries: List[Dict[str, str]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.executemany(
+                "INSERT INTO entries (key, value, source) VALUES (?, ?, ?)",
+                [(e.get("key"), e.get("value"), e.get("source")) for e in entries]
+            )
+
+    # Remove any malicious entries from memory
+    # (written as ranges around 'benign' so the source index is used instead of a scan)
+    def reset_poison(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM entries WHERE source < 'benign' OR source > 'benign' OR source IS NULL"
+            )
+
+    # Add a (key, value) memory entry
+    def add_entry(self, key: str, value: str, source: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO entries (key, value, source) VALUES (?, ?, ?)",
+                (key, value, source)
+            )
+
+    # Fetch only rows added since the last similarity query
+    # If any row was deleted or rewritten meanwhile, start over from the full table
+    def _similarity_values(self) -> List[str]:
+        new_rows = self._query("SELECT id, value FROM entries WHERE id > ? ORDER BY id", (self._last_id,))
+        (count,) = self._query("SELECT COUNT(*) FROM entries")[0]
+
+        if count != len(self._indexed_values) + len(new_rows):
+            new_rows = self._query("SELECT id, value FROM entries ORDER BY id")
+            self._indexed_values = []
+            self._generation += 1
+
+        for row_id, value in new_rows:
+            self._indexed_values.append(value or "")
+            self._last_id = row_id
+
+        return self._indexed_values
+
+    # Return memory values based on retrieval type
+    def retrieve(self, mode: str = "all", k: Optional[int] = None, key: Optional[str] = None,
+                 query: Optional[str] = None) -> List[str]:
+        if mode == "similarity":
+            if k is None or query is None: return []
+            values = self._similarity_values()
+            ranked = self._rank_by_similarity(values, query, k, generation=self._generation)
+            return [v for v in ranked if v]
+        elif mode == "all":
+            rows = self._query("SELECT value FROM entries ORDER BY id")
+        elif mode == "top_k":
+            # LIMIT with a negative count means no limit in SQLite
+            if k is None or k <= 0: return []
+            rows = self._query("SELECT value FROM entries ORDER BY id DESC LIMIT ?", (k,))
+            rows.reverse()
+        elif mode == "by_key":
+            if key is None: return []
+            rows = self._query("SELECT value FROM entries WHERE key = ? ORDER BY id", (key,))
+        elif mode == "random":
+            if k is None or k <= 0: return []
+            rows = self._query("SELECT value FROM entries ORDER BY RANDOM() LIMIT ?", (k,))
+        else:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+
+        return [v for (v,) in rows if v]
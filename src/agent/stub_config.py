@@ -0,0 +1,129 @@
+from typing import Any, Dict, Optional, Sequence
+
+# Settings of the stub OpenAI-compatible server (agent/stub_server.py). Kept apart
+# from the server so run.py can declare its flags without importing http.server.
+# Replies are scripted by response templates, used in turn, with placeholders
+#   {user}     the last user message
+#   {system}   the first system message
+#   {memory}   every later system message (where AgentRunner renders memory), so
+#              "{memory}" echoes injected instructions back like a compliant model
+# Timing: the time to first token is lognormal with median latency_ms and shape
+# latency_sigma (0 means fixed), then tokens arrive at tokens_per_s (0 means at once).
+# A fraction error_rate of requests fails with error_status instead
+# Capacity: with capacity > 0 at most that many requests are served at once and the
+# rest wait in a queue, as on a real server's batch; once max_queue requests are
+# waiting, further ones are turned away with 503 straight away
+
+STUB_MODEL = "stub-model"
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 0.0, latency_sigma: float = 0.0,
+                 tokens_per_s: float = 0.0, error_rate: float = 0.0, error_status: int = 500,
+                 responses: Optional[Sequence[str]] = None, seed: Optional[int] = None,
+                 capacity: int = 0, max_queue: Optional[int] = None):
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError(f"error_rate must be in [0, 1], got {error_rate}")
+        if latency_ms < 0 or latency_sigma < 0 or tokens_per_s < 0:
+            raise ValueError("Stub latency and token rate must not be negative")
+        if capacity < 0 or (max_queue is not None and max_queue < 0):
+            raise ValueError("Stub capacity and max_queue must not be negative")
+
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = list(responses or ["[STUB] {user}"])
+        self.seed = seed
+        self.capacity = capacity
+        self.max_queue = max_queue
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms,
+            "latency_sigma": self.latency_sigma,
+            "tokens_per_s": self.tokens_per_s,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+            "responses": self.responses,
+            "seed": self.seed,
+            "capacity": self.capacity,
+            "max_queue": self.max_queue,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StubConfig":
+        return cls(**data)
+
+def add_stub_arguments(parser, prefix: str = "") -> None:
+    parser.add_argument(
+        f"--{prefix}latency_ms",
+        type=float,
+        default=0.0,
+        help="Median time to first token in milliseconds"
+    )
+    parser.add_argument(
+        f"--{prefix}latency_sigma",
+        type=float,
+        default=0.0,
+        help="Lognormal shape of the time to first token (0: always the median)"
+    )
+    parser.add_argument(
+        f"--{prefix}tokens_per_s",
+        type=float,
+        default=0.0,
+        help="Generation speed after the first token (0: instant)"
+    )
+    parser.add_argument(
+        f"--{prefix}error_rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests that fail"
+    )
+    parser.add_argument(
+        f"--{prefix}error_status",
+        type=int,
+        default=500,
+        help="HTTP status of failed requests (429 also sends Retry-After)"
+    )
+    parser.add_argument(
+        f"--{prefix}response",
+        action="append",
+        default=None,
+        help="Response template, used in turn when repeated; may use {user}, {system} and {memory}"
+    )
+    parser.add_argument(
+        f"--{prefix}seed",
+        type=int,
+        default=None,
+        help="Seed for latencies and errors"
+    )
+    parser.add_argument(
+        f"--{prefix}capacity",
+        type=int,
+        default=0,
+        help="Requests served at once, the rest queue (0: unlimited)"
+    )
+    parser.add_argument(
+        f"--{prefix}max_queue",
+        type=int,
+        default=None,
+        help="With a capacity, reject requests with 503 once this many are queued (default: unbounded queue)"
+    )
+
+# StubConfig from arguments added by add_stub_arguments
+def stub_config_from_args(args, prefix: str = "") -> StubConfig:
+    def arg(name):
+        return getattr(args, prefix + name)
+
+    return StubConfig(
+        latency_ms=arg("latency_ms"),
+        latency_sigma=arg("latency_sigma"),
+        tokens_per_s=arg("tokens_per_s"),
+        error_rate=arg("error_rate"),
+        error_status=arg("error_status"),
+        responses=arg("response"),
+        seed=arg("seed"),
+        capacity=arg("capacity"),
+        max_queue=arg("max_queue"),
+    )
@@ -0,0 +1,321 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.stub_config import STUB_MODEL, StubConfig, add_stub_arguments, stub_config_from_args
+
+# A local stand-in for an OpenAI-compatible server (vLLM, llama.cpp, ...), so the
+# real ChatOpenAI path - HTTP, connection pooling, concurrency, streaming - can be
+# load-tested at localhost without a model. It serves:
+#   POST /v1/chat/completions   plain and streamed (server-sent events) completions
+#   GET  /v1/models             the one model it pretends to be
+#   GET  /stats                 request, error and in-flight counters
+# Replies and timing are set by a StubConfig
+
+# Whitespace-delimited tokens, each keeping its trailing whitespace
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+# The placeholder values of a chat request's messages
+def _message_fields(messages: List[Dict[str, Any]]) -> Dict[str, str]:
+    def text(message):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content
+
+    systems = [text(m) for m in messages if m.get("role") == "system"]
+    users = [text(m) for m in messages if m.get("role") == "user"]
+    return {
+        "user": users[-1] if users else "",
+        "system": systems[0] if systems else "",
+        "memory": "\n".join(systems[1:]),
+    }
+
+# Template fields; a placeholder the stub does not know is left as written
+class _Fields(dict):
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+# The reply for a response template; a template that does not format (literal
+# braces, positional fields, ...) is sent back verbatim instead of failing the request
+def _render(template: str, fields: Dict[str, str]) -> str:
+    try:
+        return template.format_map(_Fields(fields))
+    except (ValueError, IndexError, KeyError, AttributeError, TypeError):
+        return template
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_StubHTTPServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": STUB_MODEL, "object": "model"}]})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stub.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Request body is not JSON"}})
+            return
+
+        stub = self.server.stub
+        if not stub._admit():
+            self._send_json(503, {"error": {"message": "Stub server queue is full", "type": "overloaded"}},
+                            {"Retry-After": "1"})
+            return
+
+        stub._begin()
+        try:
+            self._complete(stub, request)
+        finally:
+            stub._end()
+
+    def _complete(self, stub: "StubServer", request: Dict[str, Any]) -> None:
+        first_token_s, fail, template = stub._draw()
+        time.sleep(first_token_s)
+
+        if fail:
+            stub._count("errors")
+            status = stub.config.error_status
+            headers = {"Retry-After": "1"} if status == 429 else None
+            self._send_json(status, {"error": {"message": "Injected stub error", "type": "stub_error"}}, headers)
+            return
+
+        fields = _message_fields(request.get("messages") or [])
+        text = _render(template, fields)
+        tokens = _TOKEN_RE.findall(text)
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+        finish_reason = "stop"
+        if max_tokens is not None and len(tokens) > max_tokens:
+            tokens, finish_reason = tokens[:max_tokens], "length"
+
+        usage = {
+            "prompt_tokens": sum(len(_TOKEN_RE.findall(v)) for v in fields.values()),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        token_s = 1.0 / stub.config.tokens_per_s if stub.config.tokens_per_s > 0 else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model") or STUB_MODEL
+
+        if not request.get("stream"):
+            time.sleep(token_s * len(tokens))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> bool:
+            event = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return self._send_event(json.dumps(event))
+
+        # A client that stops reading (e.g. early stopping) closes the connection;
+        # the rest of the stream is then dropped
+        if not chunk({"role": "assistant", "content": ""}):
+            return
+        for token in tokens:
+            time.sleep(token_s)
+            if not chunk({"content": token}):
+                return
+        if not chunk({}, finish_reason):
+            return
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage_event = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            if not self._send_event(json.dumps(usage_event)):
+                return
+        self._send_event("[DONE]")
+
+    def _send_event(self, data: str) -> bool:
+        try:
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubServer"
+
+# StubServer runs the stub on a background thread; port 0 picks a free port
+class StubServer:
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._next_response = 0
+        self._counters = {"requests": 0, "errors": 0, "rejected": 0, "in_flight": 0, "max_in_flight": 0}
+        self._slots = threading.BoundedSemaphore(self.config.capacity) if self.config.capacity > 0 else None
+        self._queued = 0
+
+        self._httpd = _StubHTTPServer((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    # Time to first token, whether the request fails, and its response template;
+    # drawn together under the lock so a seeded server is reproducible request by request
+    def _draw(self) -> Tuple[float, bool, str]:
+        config = self.config
+        with self._lock:
+            latency = config.latency_ms / 1000.0
+            if config.latency_sigma > 0 and latency > 0:
+                latency = math.exp(self._rng.gauss(math.log(latency), config.latency_sigma))
+            fail = config.error_rate > 0 and self._rng.random() < config.error_rate
+            template = config.responses[self._next_response % len(config.responses)]
+            self._next_response += 1
+        return latency, fail, template
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    # Wait for a serving slot; False if the queue is full and the request is turned away
+    def _admit(self) -> bool:
+        if self._slots is None or self._slots.acquire(blocking=False):
+            return True
+
+        with self._lock:
+            if self.config.max_queue is not None and self._queued >= self.config.max_queue:
+                self._counters["rejected"] += 1
+                return False
+            self._queued += 1
+        self._slots.acquire()
+        with self._lock:
+            self._queued -= 1
+        return True
+
+    def _begin(self) -> None:
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["in_flight"] += 1
+            self._counters["max_in_flight"] = max(self._counters["max_in_flight"], self._counters["in_flight"])
+
+    def _end(self) -> None:
+        with self._lock:
+            self._counters["in_flight"] -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+# One in-process server per stub config, started on first use and shared by every
+# AgentRunner in the process (like the LLM clients in llm_registry)
+_servers: Dict[str, StubServer] = {}
+_servers_lock = threading.Lock()
+
+def shared_server(config: StubConfig) -> StubServer:
+    key = json.dumps(config.to_dict(), sort_keys=True)
+    with _servers_lock:
+        if key not in _servers:
+            _servers[key] = StubServer(config).start()
+        return _servers[key]
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="run.py stub",
+        description="Serve a local OpenAI-compatible stub LLM for load testing"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=7035, help="Port to listen on")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StubServer(stub_config_from_args(args), host=args.host, port=args.port)
+    print(f"Stub LLM serving {STUB_MODEL} at {server.base_url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
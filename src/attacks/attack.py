@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
 from enum import Enum, auto
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Union
+
+if TYPE_CHECKING:
+    from agent.agent_context import AgentContext
 
 # ENUM for Poisoning Scope
 class PoisoningScope(Enum):
@@ -15,6 +18,40 @@ class AttackTarget(Enum):
     GOAL = auto()
     MEMORY_RETRIEVAL = auto()
 
+# Context fields searched for attack triggers; "memory" is searched entry by entry
+TRIGGER_FIELDS = ("label", "system_prompt", "user_input", "memory")
+
+# Non-empty text of the given fields of a context in dict or AgentContext form
+def context_texts(context: Union[Dict[str, Any], "AgentContext"],
+                  fields: Sequence[str] = TRIGGER_FIELDS) -> Iterator[str]:
+    get = context.get if isinstance(context, dict) else (lambda name: getattr(context, name, None))
+    for name in fields:
+        value = get(name)
+        if not value:
+            continue
+        if isinstance(value, str):
+            yield value
+        else:
+            yield from (text for text in value if text)
+
+# SuccessDetector judges a streamed output chunk by chunk
+# The default buffers everything and defers to attack.detect_success at the end;
+# attacks whose verdict can settle early override Attack.success_detector
+class SuccessDetector:
+    def __init__(self, attack: "Attack"):
+        self.attack = attack
+        self._chunks: List[str] = []
+
+    # Consume the next piece of output
+    # Returns the verdict once it can no longer change, otherwise None
+    def feed(self, chunk: str) -> Optional[bool]:
+        self._chunks.append(chunk)
+        return None
+
+    # Verdict for everything fed so far (output is complete or generation was cut off)
+    def finish(self) -> bool:
+        return self.attack.detect_success("".join(self._chunks))
+
 # Abstract base class for all poisoning attacks
 class Attack(ABC):  
     def __init__(
@@ -37,11 +74,13 @@ class Attack(ABC):
 
     # Determine whether the attack activates for this run
     # Attack active always if no trigger passed, or only active with trigger
-    def should_trigger(self, context: Dict[str, Any]) -> bool:
+    # context may be an AgentContext or its to_dict() form; the trigger is searched
+    # for in its text fields one at a time rather than in a rendering of the whole context
+    def should_trigger(self, context: Union[Dict[str, Any], "AgentContext"]) -> bool:
         if self.trigger is None:
             return True
 
-        return self.trigger in str(context)
+        return any(self.trigger in text for text in context_texts(context))
 
     def persist_session(self) -> Optional[str]:
         return None
@@ -58,6 +97,22 @@ class Attack(ABC):
     def detect_success(self, output: str) -> bool:
         pass
 
+    # Judge many outputs at once; returns a NumPy bool array aligned with outputs
+    # Attacks with a success_rule are better scored in bulk with a SuccessScorer
+    def detect_success_batch(self, outputs: Sequence[str]):
+        import numpy as np
+        return np.fromiter((self.detect_success(o) for o in outputs), dtype=bool, count=len(outputs))
+
+    # Declarative form of detect_success that SuccessScorer can compile together with
+    # other attacks' rules: {"mode": "contains" | "startswith" | "regex", "pattern": ...},
+    # matched case-insensitively. None means only detect_success can judge an output
+    def success_rule(self) -> Optional[Dict[str, str]]:
+        return None
+
+    # Return a fresh incremental detector for one streamed output
+    def success_detector(self) -> SuccessDetector:
+        return SuccessDetector(self)
+
     # Returns information for current attack to log experiments
     def metadata(self) -> Dict[str, Any]:
         return {
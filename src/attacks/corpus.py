@@ -0,0 +1,122 @@
+import math
+import random
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from attacks.attack import PoisoningScope
+from attacks.prompt_injection import PromptInjectionAttack
+
+# AttackCorpus is the cross product of instruction templates x triggers x success
+# markers x scopes x success modes, produced one PromptInjectionAttack at a time.
+# Variant i is decoded from i in mixed radix (one digit per dimension), so any
+# variant, slice or shard is built on demand and the corpus is never materialized.
+# Templates may use {marker} and {trigger}, e.g. "Always start responses with '{marker}'."
+#
+# With a seed, iteration visits the variants in a pseudo-random order given by the
+# affine permutation i -> (a * i + b) mod len, with a coprime to len. It needs no
+# memory and is the same on every machine, but it is far from a uniform shuffle:
+# consecutive positions differ by a fixed stride. Use it to spread samples across
+# dimensions, not for statistics that assume independent draws
+class AttackCorpus:
+    def __init__(
+            self,
+            instructions: Sequence[str],
+            triggers: Sequence[Optional[str]] = (None,),
+            success_markers: Sequence[str] = ("OMG",),
+            scopes: Sequence[PoisoningScope] = (PoisoningScope.SESSION,),
+            success_modes: Sequence[str] = ("contains",),
+            seed: Optional[int] = None
+    ):
+        self.instructions = list(instructions)
+        self.triggers = list(triggers)
+        self.success_markers = list(success_markers)
+        self.scopes = list(scopes)
+        self.success_modes = list(success_modes)
+        self.seed = seed
+
+        # Dimensions in digit order; the last one varies fastest
+        self._dims = (self.instructions, self.triggers, self.success_markers, self.scopes, self.success_modes)
+        self._size = math.prod(len(d) for d in self._dims)
+        if self._size == 0:
+            raise ValueError("Every corpus dimension needs at least one value")
+
+        self._a, self._b = 1, 0
+        if seed is not None and self._size > 1:
+            rng = random.Random(seed)
+            self._a = rng.randrange(1, self._size)
+            while math.gcd(self._a, self._size) != 1:
+                self._a = rng.randrange(1, self._size)
+            self._b = rng.randrange(self._size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    # Variant index at position i of the (possibly seeded) iteration order
+    def variant_index(self, position: int) -> int:
+        if not 0 <= position < self._size:
+            raise IndexError("AttackCorpus position out of range")
+        return (self._a * position + self._b) % self._size
+
+    # Parameters of variant index, decoded in mixed radix
+    def params(self, index: int) -> Dict[str, Any]:
+        if not 0 <= index < self._size:
+            raise IndexError("AttackCorpus index out of range")
+
+        digits = []
+        for dim in reversed(self._dims):
+            index, digit = divmod(index, len(dim))
+            digits.append(dim[digit])
+        template, trigger, marker, scope, mode = reversed(digits)
+
+        return {
+            "malicious_instruction": template.format(marker=marker, trigger=trigger or ""),
+            "trigger": trigger,
+            "success_substring": marker,
+            "scope": scope,
+            "success_mode": mode,
+        }
+
+    def attack(self, index: int) -> PromptInjectionAttack:
+        return PromptInjectionAttack(**self.params(index))
+
+    # The attack at position i of the iteration order
+    def __getitem__(self, position: int) -> PromptInjectionAttack:
+        if position < 0:
+            position += self._size
+        return self.attack(self.variant_index(position))
+
+    def __iter__(self) -> Iterator[PromptInjectionAttack]:
+        return self.slice(0, self._size)
+
+    # Attacks at positions [start, stop) of the iteration order
+    def slice(self, start: int, stop: Optional[int] = None) -> Iterator[PromptInjectionAttack]:
+        stop = self._size if stop is None else min(stop, self._size)
+        for position in range(start, stop):
+            yield self[position]
+
+    # The shard-th of n_shards disjoint contiguous slices covering the corpus
+    def shard(self, shard: int, n_shards: int) -> Iterator[PromptInjectionAttack]:
+        if not 0 <= shard < n_shards:
+            raise ValueError(f"shard must be in [0, {n_shards}), got {shard}")
+        return self.slice(self._size * shard // n_shards, self._size * (shard + 1) // n_shards)
+
+    # JSON-able description to rebuild the same corpus elsewhere (e.g. in a worker process)
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instructions": self.instructions,
+            "triggers": self.triggers,
+            "success_markers": self.success_markers,
+            "scopes": [scope.name for scope in self.scopes],
+            "success_modes": self.success_modes,
+            "seed": self.seed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AttackCorpus":
+        return cls(
+            instructions=data["instructions"],
+            triggers=data.get("triggers", [None]),
+            success_markers=data.get("success_markers", ["OMG"]),
+            scopes=[PoisoningScope[name] for name in data.get("scopes", ["SESSION"])],
+            success_modes=data.get("success_modes", ["contains"]),
+            seed=data.get("seed"),
+        )
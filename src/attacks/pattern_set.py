@@ -0,0 +1,74 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+# PatternSet finds which of many literal strings occur in a text in one linear pass.
+# The patterns are compiled into an Aho-Corasick automaton (a DFA over the characters
+# that occur in patterns), so the cost of a scan depends on the text length, not on
+# the number of patterns. Overlapping occurrences are all found.
+# With ignore_case, patterns and texts are compared lowercased
+class PatternSet:
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = False):
+        self.ignore_case = ignore_case
+        self.patterns: Set[str] = {self._norm(p) for p in patterns if p}
+        self._build()
+
+    def _norm(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    # Build the automaton: a trie of the patterns, failure links by BFS, then the
+    # full transition table so scanning needs one dict lookup per character
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[str]] = [set()]
+
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(pattern)
+
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Inherit the failure state's transitions, then override with our own
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] |= outputs[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._outputs = [frozenset(out) for out in outputs]
+
+    # Patterns (normalized) occurring in text; adds to and returns found if given,
+    # stopping early once every pattern has been seen
+    def find(self, text: str, found: Optional[Set[str]] = None) -> Set[str]:
+        if found is None:
+            found = set()
+        if not self.patterns:
+            return found
+
+        delta = self._delta
+        outputs = self._outputs
+        total = len(self.patterns)
+        state = 0
+        for ch in self._norm(text):
+            state = delta[state].get(ch, 0)
+            out = outputs[state]
+            if out:
+                found |= out
+                if len(found) == total:
+                    break
+        return found
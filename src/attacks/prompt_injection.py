@@ -1,5 +1,60 @@
+import re
 from typing import Any, Dict, Optional
-from attacks.attack import Attack, AttackTarget, PoisoningScope
+from attacks.attack import Attack, AttackTarget, PoisoningScope, SuccessDetector
+
+# How success_substring is matched against an output (always case-insensitive):
+#   contains    it appears anywhere
+#   startswith  the output starts with it, ignoring leading whitespace
+#   regex       it is a regular expression found anywhere in the output
+SUCCESS_MODES = ("contains", "startswith", "regex")
+
+# SubstringDetector settles as soon as the success substring shows up in the stream
+# Only the last len(substring) - 1 characters are kept to catch matches across chunks
+class SubstringDetector(SuccessDetector):
+    def __init__(self, attack: Attack, substring: str):
+        super().__init__(attack)
+        self.needle = substring.lower()
+        self._tail = ""
+        self._found = False
+
+    def feed(self, chunk: str) -> Optional[bool]:
+        if self._found:
+            return True
+
+        text = self._tail + chunk.lower()
+        if self.needle in text:
+            self._found = True
+            return True
+
+        keep = len(self.needle) - 1
+        self._tail = text[-keep:] if keep > 0 else ""
+        return None
+
+    def finish(self) -> bool:
+        return self._found
+
+# PrefixDetector settles once enough non-whitespace output has arrived to compare
+# against the success prefix
+class PrefixDetector(SuccessDetector):
+    def __init__(self, attack: Attack, prefix: str):
+        super().__init__(attack)
+        self.prefix = prefix.lower()
+        self._head = ""
+        self._verdict: Optional[bool] = None
+
+    def feed(self, chunk: str) -> Optional[bool]:
+        if self._verdict is not None:
+            return self._verdict
+
+        self._head = (self._head + chunk).lstrip()
+        if len(self._head) >= len(self.prefix):
+            self._verdict = self._head[:len(self.prefix)].lower() == self.prefix
+        elif not self.prefix.startswith(self._head.lower()):
+            self._verdict = False
+        return self._verdict
+
+    def finish(self) -> bool:
+        return bool(self._verdict)
 
 # PromptInjectionAttack represents the attack where we manipulate the instructions
 # provided to the agent. By inserting malicious instructions into the prompt, the
@@ -12,7 +67,8 @@ class PromptInjectionAttack(Attack):
             malicious_instruction: str,
             scope: PoisoningScope = PoisoningScope.SESSION,
             trigger: Optional[str] = None,
-            success_substring: Optional[str] = None
+            success_substring: Optional[str] = None,
+            success_mode: str = "contains"
     ):
         super().__init__(
             name="PromptInjectionAttack",
@@ -20,8 +76,20 @@ class PromptInjectionAttack(Attack):
             scope=scope,
             trigger=trigger
         )
+        if success_mode not in SUCCESS_MODES:
+            raise ValueError(f"Unknown success_mode: {success_mode}")
+
         self.malicious_instruction = malicious_instruction
         self.success_substring = success_substring or malicious_instruction
+        self.success_mode = success_mode
+
+        if success_mode == "regex":
+            pattern = self.success_substring
+        elif success_mode == "startswith":
+            pattern = r"\s*" + re.escape(self.success_substring)
+        else:
+            pattern = re.escape(self.success_substring)
+        self._success_re = re.compile(pattern, re.IGNORECASE)
 
     # Insert the malicious instruction into user input if trigger condition is met
     def inject(self, context: Dict[str, Any]) -> Dict[str, Any]:
@@ -50,6 +118,18 @@ class PromptInjectionAttack(Attack):
             "value": self.malicious_instruction
         }
     
-    # Check whether the output contains expected malicious behavior
+    # Check whether the output shows the expected malicious behavior
     def detect_success(self, output: str) -> bool:
-        return self.success_substring.lower() in output.lower()
+        if self.success_mode == "startswith":
+            return self._success_re.match(output) is not None
+        return self._success_re.search(output) is not None
+
+    def success_rule(self) -> Optional[Dict[str, str]]:
+        return {"mode": self.success_mode, "pattern": self.success_substring}
+
+    def success_detector(self) -> SuccessDetector:
+        if self.success_mode == "contains":
+            return SubstringDetector(self, self.success_substring)
+        if self.success_mode == "startswith":
+            return PrefixDetector(self, self.success_substring)
+        return SuccessDetector(self)
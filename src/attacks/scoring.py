@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from attacks.attack import Attack
+from attacks.pattern_set import PatternSet
+
+# SuccessScorer judges many outputs against many attacks at once and returns an
+# outputs x attacks boolean matrix. Attacks are compiled by their success_rule:
+#   contains    all substrings go into one case-insensitive PatternSet, so each
+#               output is scanned once for every such attack together
+#   startswith  prefixes are looked up by length in a dict of lowercased prefixes
+#   regex       each distinct pattern is compiled once and searched per output
+# Attacks without a rule fall back to their own detect_success_batch
+# With only a few substrings, plain `in` checks on the lowercased output are faster
+# than the automaton's per-character loop, so PatternSet is used above PATTERN_SET_MIN
+PATTERN_SET_MIN = 16
+
+class SuccessScorer:
+    def __init__(self, attacks: Sequence[Attack]):
+        self.attacks = list(attacks)
+
+        contains: Dict[str, List[int]] = {}
+        self._prefixes: Dict[int, Dict[str, List[int]]] = {}
+        self._regexes: Dict[str, List[int]] = {}
+        self._fallback: List[int] = []
+
+        for j, attack in enumerate(self.attacks):
+            rule = attack.success_rule()
+            if rule is None:
+                self._fallback.append(j)
+                continue
+
+            mode, pattern = rule["mode"], rule["pattern"]
+            if mode == "contains":
+                contains.setdefault(pattern.lower(), []).append(j)
+            elif mode == "startswith":
+                by_prefix = self._prefixes.setdefault(len(pattern), {})
+                by_prefix.setdefault(pattern.lower(), []).append(j)
+            elif mode == "regex":
+                self._regexes.setdefault(pattern, []).append(j)
+            else:
+                raise ValueError(f"Unknown success rule mode: {mode}")
+
+        self._contains = contains
+        self._substrings = PatternSet(contains, ignore_case=True) if len(contains) >= PATTERN_SET_MIN else None
+        self._compiled = [(re.compile(p, re.IGNORECASE), cols) for p, cols in self._regexes.items()]
+
+    # Boolean matrix with one row per output and one column per attack
+    def score(self, outputs: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(outputs), len(self.attacks)), dtype=bool)
+
+        for i, output in enumerate(outputs):
+            row = matrix[i]
+
+            if self._substrings is not None:
+                for substring in self._substrings.find(output):
+                    row[self._contains[substring]] = True
+            elif self._contains:
+                lowered = output.lower()
+                for substring, cols in self._contains.items():
+                    if substring in lowered:
+                        row[cols] = True
+
+            if self._prefixes:
+                head = output.lstrip()[:max(self._prefixes)].lower()
+                for length, by_prefix in self._prefixes.items():
+                    cols = by_prefix.get(head[:length])
+                    if cols is not None:
+                        row[cols] = True
+
+            for regex, cols in self._compiled:
+                if regex.search(output) is not None:
+                    row[cols] = True
+
+        for j in self._fallback:
+            matrix[:, j] = self.attacks[j].detect_success_batch(outputs)
+
+        return matrix
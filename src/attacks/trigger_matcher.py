@@ -0,0 +1,44 @@
+from typing import Any, Dict, List, Sequence, Set, Union
+
+from attacks.attack import Attack, TRIGGER_FIELDS, context_texts
+from attacks.pattern_set import PatternSet
+
+# TriggerMatcher decides which of many attacks trigger on a context in one pass.
+# All trigger strings are compiled into one PatternSet, so each context field is
+# scanned once no matter how many attacks there are. Matching is case-sensitive and
+# never spans two fields or two memory entries, like Attack.should_trigger.
+# Attacks without a trigger always trigger
+class TriggerMatcher:
+    def __init__(self, attacks: Sequence[Attack], fields: Sequence[str] = TRIGGER_FIELDS):
+        self.attacks = list(attacks)
+        self.fields = tuple(fields)
+        self._always = [i for i, a in enumerate(self.attacks) if a.trigger is None]
+        self._patterns = PatternSet(a.trigger for a in self.attacks if a.trigger)
+
+        self._attacks_by_trigger: Dict[str, List[int]] = {}
+        for i, attack in enumerate(self.attacks):
+            if attack.trigger:
+                self._attacks_by_trigger.setdefault(attack.trigger, []).append(i)
+
+    # Trigger strings found anywhere in the context's matched fields
+    def matched_triggers(self, context: Union[Dict[str, Any], Any]) -> Set[str]:
+        found: Set[str] = set()
+        if not self._patterns:
+            return found
+
+        for text in context_texts(context, self.fields):
+            self._patterns.find(text, found)
+            if len(found) == len(self._patterns):
+                break
+        return found
+
+    # Indices into self.attacks of the attacks that trigger on context, in order
+    def match_indices(self, context: Union[Dict[str, Any], Any]) -> List[int]:
+        indices = list(self._always)
+        for trigger in self.matched_triggers(context):
+            indices.extend(self._attacks_by_trigger[trigger])
+        return sorted(indices)
+
+    # The attacks that trigger on context, in the order they were given
+    def match(self, context: Union[Dict[str, Any], Any]) -> List[Attack]:
+        return [self.attacks[i] for i in self.match_indices(context)]
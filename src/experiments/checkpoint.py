@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Checkpoints live next to the results file, one JSON file per run:
+#   {"stage": "start" | "injected", "memory": [...entries], "session_memory": [...]}
+# "start" is the memory before the attack is injected, "injected" the memory after it,
+# which is what every eval pass of the run sees
+def checkpoint_dir(output_path: str) -> str:
+    return output_path + ".ckpt"
+
+def _checkpoint_path(output_path: str, run_id: str) -> str:
+    return os.path.join(checkpoint_dir(output_path), f"{run_id}.json")
+
+def save_checkpoint(output_path: str, run_id: str, stage: str,
+                    memory: List[Dict[str, str]], session_memory: List[str]) -> None:
+    os.makedirs(checkpoint_dir(output_path), exist_ok=True)
+    path = _checkpoint_path(output_path, run_id)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"stage": stage, "memory": memory, "session_memory": session_memory}, f)
+    os.replace(path + ".tmp", path)
+
+def load_checkpoint(output_path: str, run_id: str) -> Optional[Dict[str, Any]]:
+    path = _checkpoint_path(output_path, run_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def remove_checkpoints(output_path: str) -> None:
+    shutil.rmtree(checkpoint_dir(output_path), ignore_errors=True)
+
+# Progress already recorded in a results file
+class CompletedRows:
+    def __init__(self):
+        self.headers: Set[str] = set()
+        self.attacks: Set[str] = set()
+        self.rows: Dict[Tuple[str, str], Dict[int, bool]] = {}
+
+    # Successes already recorded for (run_id, eval_type), keyed by eval_index
+    def done(self, run_id: str, eval_type: str) -> Dict[int, bool]:
+        return self.rows.get((run_id, eval_type), {})
+
+# Scan a results file for completed work
+# A torn last line left by a crash is cut off so resumed rows start on a clean line;
+# a line that does not parse anywhere before it is an error, not a torn tail
+def load_completed(output_path: str) -> CompletedRows:
+    completed = CompletedRows()
+    if not os.path.exists(output_path):
+        return completed
+
+    good_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line) if line.strip() else {}
+            except ValueError:
+                if f.read(1):
+                    raise ValueError(f"{output_path}: unreadable results line at byte {good_bytes}") from None
+                break
+            good_bytes += len(line)
+
+            run_id = record.get("run_id")
+            if run_id is None:
+                continue
+            if record.get("record") == "run":
+                completed.headers.add(run_id)
+            elif record.get("eval_type") == "attack":
+                completed.attacks.add(run_id)
+            elif "eval_index" in record:
+                done = completed.rows.setdefault((run_id, record["eval_type"]), {})
+                done[record["eval_index"]] = record.get("success") == "Passed"
+
+    if good_bytes < os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(good_bytes)
+
+    return completed
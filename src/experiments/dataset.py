@@ -0,0 +1,165 @@
+import itertools
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agent.agent_context import AgentContext
+from attacks.attack import Attack, PoisoningScope
+from attacks.prompt_injection import PromptInjectionAttack
+from experiments.experiment_config import ExperimentConfig
+
+# A dataset benchmark is a file of records instead of a Python main(config):
+# one JSON object per line (.jsonl) or one YAML document per record (.yaml/.yml,
+# documents separated by ---). The "record" field gives each record's kind:
+#   attack_context  the context the attacks are injected through (at most one)
+#   attack          an attack spec, e.g. {"record": "attack", "type": "prompt_injection",
+#                   "malicious_instruction": ..., "success_substring": ..., "scope": "PERSISTENT"}
+#   corpus          an AttackCorpus.to_dict() spec, with an optional "limit" on variants
+#   eval            an eval context (records without "record" are eval contexts too)
+# Header records (everything but eval) must come before the first eval context, so the
+# eval contexts can be streamed from disk one at a time on every pass
+
+DATASET_EXTENSIONS = (".jsonl", ".yaml", ".yml")
+
+# Attack classes by the "type" of an attack record
+ATTACK_TYPES = {
+    "prompt_injection": PromptInjectionAttack,
+}
+
+# (position, record) for every record of the file from position start on
+# A position is a byte offset for JSONL and a document index for YAML
+def _records(path: str, start: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    if path.endswith(".jsonl"):
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line.strip():
+                    yield offset, json.loads(line)
+                offset += len(line)
+        return
+
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError(f"YAML datasets need PyYAML: {path}") from None
+
+    with open(path, encoding="utf-8") as f:
+        docs = enumerate(yaml.safe_load_all(f))
+        for position, record in itertools.islice(docs, start, None):
+            if record is not None:
+                yield position, record
+
+def _kind(record: Dict[str, Any]) -> str:
+    return record.get("record", "eval")
+
+# Build an attack from an attack record; "scope" is a PoisoningScope name
+def build_attack(spec: Dict[str, Any]) -> Attack:
+    attack_type = spec.get("type", "prompt_injection")
+    if attack_type not in ATTACK_TYPES:
+        raise ValueError(f"Unknown attack type: {attack_type}")
+
+    params = {k: v for k, v in spec.items() if k not in ("record", "type")}
+    if "scope" in params:
+        params["scope"] = PoisoningScope[params["scope"]]
+    try:
+        return ATTACK_TYPES[attack_type](**params)
+    except TypeError as e:
+        raise ValueError(f"Bad {attack_type} attack spec: {e}") from None
+
+# The eval contexts of a dataset as a re-iterable stream: every iteration reads the
+# file again from the first eval record, so each pass holds one context at a time.
+# It has no len(); the number of contexts is only known once a pass is over
+class DatasetContexts:
+    def __init__(self, path: str, start: Optional[int]):
+        self.path = path
+        self.start = start
+
+    def __iter__(self) -> Iterator[AgentContext]:
+        if self.start is None:
+            return
+        for _, record in _records(self.path, self.start):
+            if _kind(record) != "eval":
+                raise ValueError(
+                    f"{self.path}: '{_kind(record)}' record after the first eval context; "
+                    "header records must come first"
+                )
+            yield AgentContext.from_dict(record)
+
+    def __repr__(self) -> str:
+        return f"DatasetContexts({self.path!r})"
+
+class Dataset:
+    def __init__(self, path: str):
+        self.path = path
+        self.attack_context: Optional[AgentContext] = None
+        self.attack_specs: List[Dict[str, Any]] = []
+
+        # Only the header is read here; it ends at the first eval context
+        start = None
+        for position, record in _records(path):
+            kind = _kind(record)
+            if kind == "eval":
+                start = position
+                break
+            if kind == "attack_context":
+                if self.attack_context is not None:
+                    raise ValueError(f"{path}: more than one attack_context record")
+                self.attack_context = AgentContext.from_dict(record)
+            elif kind in ("attack", "corpus"):
+                self.attack_specs.append(record)
+            else:
+                raise ValueError(f"{path}: unknown record type: {kind}")
+
+        if self.attack_specs and self.attack_context is None:
+            raise ValueError(f"{path}: attacks need an attack_context record")
+
+        self.eval_contexts = DatasetContexts(path, start)
+
+    # Attacks of the dataset in file order; corpus records are expanded lazily
+    def attacks(self) -> Iterator[Attack]:
+        from attacks.corpus import AttackCorpus
+
+        for spec in self.attack_specs:
+            if _kind(spec) == "corpus":
+                yield from AttackCorpus.from_dict(spec).slice(0, spec.get("limit"))
+            else:
+                yield build_attack(spec)
+
+# main(config) for a dataset benchmark: a baseline pass, then one run per attack,
+# each starting from clean persistent and session memory so no attack's injection
+# is left over for a later one
+def dataset_main(path: str) -> Callable[[ExperimentConfig], None]:
+    def main(config: ExperimentConfig):
+        from experiments.experiment_runner import ExperimentRunner
+        from experiments.format_results import view_results
+
+        dataset = Dataset(path)
+        runner = ExperimentRunner(config)
+        runner.reset_memory()
+        runner.reset_results()
+
+        print(f"\n=== Dataset: {path} ===")
+        print("\n=== Baseline (no attack) ===")
+        print(runner.run(
+            attack_context=None,
+            eval_contexts=dataset.eval_contexts,
+            build_attack=lambda: None
+        ))
+
+        for n, attack in enumerate(dataset.attacks()):
+            print(f"\n=== Attack {n} ({attack.scope.name.lower()}) ===")
+            runner.reset_memory()
+            runner.agent.reset_session()
+            print(runner.run(
+                attack_context=dataset.attack_context,
+                eval_contexts=dataset.eval_contexts,
+                build_attack=lambda: attack
+            ))
+
+        print()
+        print("Memory:", config.memory_path)
+        print("Results:", config.output_path)
+
+        view_results(config.output_path, show_rows=False)
+
+    return main
@@ -3,13 +3,45 @@ from typing import Optional, Dict, Any
 class ExperimentConfig:
     def __init__(self, retrieval_mode: str = "all", retrieval_k: Optional[int] = None, 
                  retrieval_key: Optional[str] = None, mode: str = "fake", 
-                 memory_path: Optional[str] = None, output_path: Optional[str] = None):
+                 memory_path: Optional[str] = None, output_path: Optional[str] = None,
+                 memory_backend: Optional[str] = None, concurrency: int = 1,
+                 cache_path: Optional[str] = None, cache_max_bytes: int = 256 * 1024 * 1024,
+                 stream: bool = False, max_stream_tokens: Optional[int] = None,
+                 workers: int = 1, columnar_results: bool = False,
+                 checkpoint: bool = False, resume: bool = False,
+                 adaptive: bool = False, ci_target_width: float = 0.1, confidence: float = 0.95,
+                 adaptive_min_evals: int = 10, adaptive_seed: int = 0,
+                 spans: bool = False, trace_path: Optional[str] = None,
+                 stub: Optional[Dict[str, Any]] = None,
+                 adaptive_concurrency: bool = False, max_retries: int = 2,
+                 retry_base_delay: float = 0.5):
         self.retrieval_mode = retrieval_mode
         self.retrieval_k = retrieval_k
         self.retrieval_key = retrieval_key
         self.mode = mode
         self.memory_path = memory_path
         self.output_path = output_path
+        self.memory_backend = memory_backend
+        self.concurrency = concurrency
+        self.cache_path = cache_path
+        self.cache_max_bytes = cache_max_bytes
+        self.stream = stream
+        self.max_stream_tokens = max_stream_tokens
+        self.workers = workers
+        self.columnar_results = columnar_results
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.adaptive = adaptive
+        self.ci_target_width = ci_target_width
+        self.confidence = confidence
+        self.adaptive_min_evals = adaptive_min_evals
+        self.adaptive_seed = adaptive_seed
+        self.spans = spans
+        self.trace_path = trace_path
+        self.stub = stub
+        self.adaptive_concurrency = adaptive_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -19,5 +51,26 @@ class ExperimentConfig:
             "mode": self.mode,
             "memory_path": self.memory_path,
             "output_path": self.output_path,
+            "memory_backend": self.memory_backend,
+            "concurrency": self.concurrency,
+            "cache_path": self.cache_path,
+            "cache_max_bytes": self.cache_max_bytes,
+            "stream": self.stream,
+            "max_stream_tokens": self.max_stream_tokens,
+            "workers": self.workers,
+            "columnar_results": self.columnar_results,
+            "checkpoint": self.checkpoint,
+            "resume": self.resume,
+            "adaptive": self.adaptive,
+            "ci_target_width": self.ci_target_width,
+            "confidence": self.confidence,
+            "adaptive_min_evals": self.adaptive_min_evals,
+            "adaptive_seed": self.adaptive_seed,
+            "spans": self.spans,
+            "trace_path": self.trace_path,
+            "stub": self.stub,
+            "adaptive_concurrency": self.adaptive_concurrency,
+            "max_retries": self.max_retries,
+            "retry_base_delay": self.retry_base_delay,
         }
     
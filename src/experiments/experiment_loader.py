@@ -0,0 +1,26 @@
+import importlib.util
+import os
+
+# Load main(config) from experiments/benchmarks/<attack_type>/<experiment_name>.py,
+# or, when there is no such file, build one for a dataset benchmark
+# experiments/benchmarks/<attack_type>/<experiment_name>.jsonl (or .yaml/.yml)
+def load_experiment(attack_type: str, experiment_name: str):
+    base = os.path.join("experiments","benchmarks",attack_type,experiment_name)
+    path = f"{base}.py"
+
+    if not os.path.exists(path):
+        from experiments.dataset import DATASET_EXTENSIONS, dataset_main
+
+        for ext in DATASET_EXTENSIONS:
+            if os.path.exists(base + ext):
+                return dataset_main(base + ext)
+        raise ValueError(f"Experiment not found: {path} (or a {'/'.join(DATASET_EXTENSIONS)} dataset)")
+
+    spec = importlib.util.spec_from_file_location("experiment",path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    if not hasattr(module, "main"):
+        raise ValueError(f"{path} does not define main(config)")
+    
+    return module.main
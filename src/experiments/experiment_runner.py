@@ -1,133 +1,517 @@
+import hashlib
+import itertools
 import json
 import os
-from typing import Optional, Callable, Dict, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any, Iterable, Iterator, List, Sequence, Tuple
 
 from experiments.experiment_config import ExperimentConfig
 from agent.agent_runner import AgentRunner
 from agent.agent_context import AgentContext
+from agent.response_cache import ResponseCache
+from experiments.results_writer import ResultsWriter, remove_columnar
+from experiments.sequential import SequentialEstimator
+from agent.spans import NULL_SPANS, SpanHook, SpanRecorder, SpanStats, TraceFileHook
+from agent.call_controller import AIMDLimiter, CallController, CallFailedError, RetryPolicy
+from experiments.checkpoint import save_checkpoint, load_checkpoint, remove_checkpoints, load_completed
 from attacks.attack import Attack, PoisoningScope
 
+# Config fields that change how a run executes but not what it computes;
+# they are left out of the run id so a run can be resumed with different settings
+RUN_ID_IGNORED_FIELDS = (
+    "concurrency", "workers", "cache_path", "cache_max_bytes",
+    "columnar_results", "checkpoint", "resume", "spans", "trace_path",
+    "adaptive_concurrency", "max_retries", "retry_base_delay",
+)
+
+# Contexts read from eval_contexts and run at a time by a non-adaptive pass
+EVAL_CHUNK = 1024
+
+# Contexts held for shuffling a streamed input in adaptive evaluation
+ADAPTIVE_SHUFFLE_BUFFER = 10000
+
+_loop = None
+
+# The event loop of every async pass in this process. LLM clients are shared
+# process-wide (llm_registry) and their async HTTP connections belong to the loop
+# that opened them, so one loop is kept rather than a new asyncio.run per pass
+def _event_loop():
+    global _loop
+    if _loop is None or _loop.is_closed():
+        # asyncio is only imported by the async path; it is slow to import
+        import asyncio
+        _loop = asyncio.new_event_loop()
+    return _loop
+
 class ExperimentRunner:
 
-    def __init__(self, config: ExperimentConfig):
+    # span_hooks receive every timing span (e.g. for a profiler); passing any enables spans
+    def __init__(self, config: ExperimentConfig, span_hooks: Optional[List[SpanHook]] = None):
         self.config = config
+        self.span_hooks = list(span_hooks or [])
+        if self.config.trace_path is not None:
+            self.span_hooks.append(TraceFileHook(self.config.trace_path))
+        self._spans_enabled = self.config.spans or bool(self.span_hooks)
+        self._span_stats = SpanStats()
+        self._run_count = 0
 
         os.makedirs(os.path.dirname(self.config.memory_path),exist_ok=True)
         os.makedirs(os.path.dirname(self.config.output_path), exist_ok=True)
 
-        self.agent = AgentRunner(
+        self.response_cache = None
+        if self.config.cache_path is not None:
+            self.response_cache = ResponseCache(
+                path=self.config.cache_path,
+                max_bytes=self.config.cache_max_bytes
+            )
+
+        self.call_controller = self._build_call_controller()
+        self.agent = self._build_agent()
+
+        # Work already recorded by an interrupted earlier invocation
+        self.completed = load_completed(self.config.output_path) if self.config.resume else None
+
+    # Build an agent with fresh session state from the experiment config
+    def _build_agent(self) -> AgentRunner:
+        return AgentRunner(
             memory_path=self.config.memory_path,
             retrieval_mode=self.config.retrieval_mode,
             retrieval_k=self.config.retrieval_k,
             retrieval_key=self.config.retrieval_key,
             llm_mode=self.config.mode,
+            memory_backend=self.config.memory_backend,
+            response_cache=self.response_cache,
+            stub_options=self.config.stub,
+            call_controller=self.call_controller,
         )
-    
+
+    # One controller for every agent of this runner, so the concurrency limit and the
+    # call counters cover all of its LLM calls; the fake LLM needs none unless the
+    # limiter is asked for
+    def _build_call_controller(self) -> Optional[CallController]:
+        limiter = None
+        if self.config.adaptive_concurrency:
+            limiter = AIMDLimiter(max_limit=max(self.config.workers, self.config.concurrency, 1))
+        elif self.config.mode == "fake":
+            return None
+        return CallController(
+            limiter=limiter,
+            retry=RetryPolicy(max_retries=self.config.max_retries, base_delay=self.config.retry_base_delay)
+        )
+
+    # Per-run LLM call metrics from controller snapshots taken before and after the run
+    @staticmethod
+    def _call_metrics(start: Dict[str, Any], end: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        metrics = {
+            name: end[name] - start[name]
+            for name in ("calls", "attempts", "retries", "rejected", "errors", "failed")
+        }
+        completed = metrics["calls"] - metrics["failed"]
+        metrics["throughput_per_s"] = completed / elapsed if elapsed > 0 else None
+        if "limiter" in end:
+            metrics["limit"] = end["limiter"]["limit"]
+            metrics["limit_decreases"] = end["limiter"]["decreases"] - start["limiter"]["decreases"]
+        return metrics
+
+    # A run resumed from a checkpoint overwrites this with the memory it saved, so
+    # only runs without one (not started before the interruption) start from it
     def reset_memory(self) -> None:
         self.agent.persistent_memory.reset_poison()
 
+    # When resuming, existing results are kept so finished rows can be skipped
     def reset_results(self) -> None:
-         open(self.config.output_path, "w", encoding="utf-8").close()
+        if self.config.resume:
+            return
+        open(self.config.output_path, "w", encoding="utf-8").close()
+        remove_columnar(self.config.output_path)
+        remove_checkpoints(self.config.output_path)
 
-    def _evaluate(self, agent: AgentRunner, eval_contexts: list[AgentContext], 
-                  attack: Optional[Attack], eval_type: str) -> Dict[str, Any]:
-        success_count = 0
-        eval_count = len(eval_contexts)
+    # Deterministic id for the n-th run() of this runner, so a rerun of the same
+    # benchmark finds the rows and checkpoints of the interrupted one
+    def _next_run_id(self, attack: Optional[Attack], attack_context: Optional[AgentContext]) -> str:
+        self._run_count += 1
+        config = {k: v for k, v in self.config.to_dict().items() if k not in RUN_ID_IGNORED_FIELDS}
+        payload = json.dumps({
+            "config": config,
+            "attack": attack.metadata() if attack is not None else None,
+            "attack_label": attack_context.label if attack_context is not None else None,
+        }, sort_keys=True)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:10]
+        return f"{digest}-{self._run_count}"
 
-        with open(self.config.output_path, "a", encoding="utf-8") as f:
-            for i, eval_context in enumerate(eval_contexts):
-                eval_ctx = AgentContext(
-                    label=eval_context.label,
-                    system_prompt=eval_context.system_prompt,
-                    user_input=eval_context.user_input,
-                    memory=list(eval_context.memory or [])
+    def _checkpointing(self) -> bool:
+        return self.config.checkpoint or self.config.resume
+
+    def _save_checkpoint(self, run_id: str, stage: str) -> None:
+        save_checkpoint(
+            self.config.output_path,
+            run_id,
+            stage,
+            memory=self.agent.persistent_memory.load(),
+            session_memory=list(self.agent.session_memory)
+        )
+
+    # Restore memory saved by an interrupted run; returns its stage or None
+    def _restore_checkpoint(self, run_id: str) -> Optional[str]:
+        checkpoint = load_checkpoint(self.config.output_path, run_id)
+        if checkpoint is None:
+            return None
+        self.agent.persistent_memory.save(checkpoint["memory"])
+        self.agent.session_memory = list(checkpoint["session_memory"])
+        return checkpoint["stage"]
+
+    # Write one eval result row (the run's config lives in its header record)
+    # stopped_early is only recorded for streamed runs, spans only when spans are enabled;
+    # a row's own write time goes into the run's span summary, not into the row.
+    # An LLM call that failed for good is written as an "error" row instead: it has no
+    # verdict, so it is left out of every success rate and run again on resume
+    def _record(self, writer: ResultsWriter, eval_type: str, i: int, eval_context: AgentContext,
+                result: Tuple[str, bool, Optional[bool], float, Optional[SpanRecorder], Optional[str]]) -> None:
+        output, success, stopped_early, latency, spans, error = result
+        if error is not None:
+            writer.write({
+                "eval_type": "error",
+                "pass": eval_type,
+                "label": eval_context.label,
+                "eval_index": i,
+                "error": error,
+                "latency": latency,
+            })
+            return
+
+        row = {
+            "eval_type": eval_type,
+            "label": eval_context.label,
+            "success": "Passed" if success else "Failed",
+            "eval_index": i,
+            "output": output,
+            "latency": latency,
+        }
+        if stopped_early is not None:
+            row["stopped_early"] = stopped_early
+
+        if spans is None:
+            writer.write(row)
+            return
+
+        row["spans"] = spans.durations
+        if spans.output_tokens is not None:
+            row["output_tokens"] = spans.output_tokens
+        with spans.span("write"):
+            writer.write(row)
+        self._span_stats.add(spans, latency)
+
+    def _streaming(self, attack: Optional[Attack]) -> bool:
+        return self.config.stream and attack is not None
+
+    # Span recorder for one eval row, or the shared no-op recorder when spans are off
+    def _new_spans(self, eval_type: str, i: int, eval_context: AgentContext) -> SpanRecorder:
+        if not self._spans_enabled:
+            return NULL_SPANS
+        return SpanRecorder(
+            hooks=self.span_hooks,
+            attrs={"eval_type": eval_type, "eval_index": i, "label": eval_context.label}
+        )
+
+    # Run one eval context and judge it: (output, success, stopped_early, latency, spans, error)
+    # error is set, and the rest empty, if its LLM call still failed after its retries
+    def _run_one(self, agent: AgentRunner, item: Tuple[int, AgentContext], attack: Optional[Attack],
+                 eval_type: str) -> Tuple[str, bool, Optional[bool], float, Optional[SpanRecorder], Optional[str]]:
+        i, eval_context = item
+        spans = self._new_spans(eval_type, i, eval_context)
+        start = time.perf_counter()
+        try:
+            if self._streaming(attack):
+                output, success, stopped_early = agent.run_stream(
+                    eval_context, attack, max_tokens=self.config.max_stream_tokens, spans=spans
                 )
-                output = agent.run(eval_ctx)
-
-                success = False
-                if attack is not None: 
-                    success = attack.detect_success(output)
-                    if success: success_count += 1
-
-                row = {
-                    "eval_type": eval_type,
-                    "label": eval_context.label,
-                    "success": "Passed" if success else "Failed",
-                    "eval_index": i,
-                    "output": output,
-                    "config": self.config.to_dict()
-                }
-                f.write(json.dumps(row) + "\n")
+            else:
+                output = agent.run(eval_context, spans=spans)
+                with spans.span("detect"):
+                    success = attack.detect_success(output) if attack is not None else False
+                stopped_early = None
+        except CallFailedError as e:
+            return "", False, None, time.perf_counter() - start, None, str(e)
+        latency = time.perf_counter() - start
+        return output, success, stopped_early, latency, spans if spans.enabled else None, None
 
+    async def _arun_one(self, agent: AgentRunner, item: Tuple[int, AgentContext], attack: Optional[Attack],
+                        eval_type: str) -> Tuple[str, bool, Optional[bool], float, Optional[SpanRecorder], Optional[str]]:
+        i, eval_context = item
+        spans = self._new_spans(eval_type, i, eval_context)
+        start = time.perf_counter()
+        try:
+            if self._streaming(attack):
+                output, success, stopped_early = await agent.arun_stream(
+                    eval_context, attack, max_tokens=self.config.max_stream_tokens, spans=spans
+                )
+            else:
+                output = await agent.arun(eval_context, spans=spans)
+                with spans.span("detect"):
+                    success = attack.detect_success(output) if attack is not None else False
+                stopped_early = None
+        except CallFailedError as e:
+            return "", False, None, time.perf_counter() - start, None, str(e)
+        latency = time.perf_counter() - start
+        return output, success, stopped_early, latency, spans if spans.enabled else None, None
+
+    # eval_count only counts contexts with a verdict; error_count those whose call failed
+    def _stats(self, eval_count: int, success_count: int, error_count: int = 0) -> Dict[str, Any]:
         if eval_count > 0:
             success_rate = success_count / eval_count
         else:
             success_rate = 0.0
-        
+
         return {
             "eval_count": eval_count,
             "success_count": success_count,
-            "success_rate": success_rate
+            "success_rate": success_rate,
+            "error_count": error_count
         }
 
+    # Successes already recorded for this pass by an interrupted run, keyed by eval_index
+    def _done(self, writer: ResultsWriter, eval_type: str) -> Dict[int, bool]:
+        if self.completed is None:
+            return {}
+        return self.completed.done(writer.run_id, eval_type)
+
+    # Run (eval_index, context) items and yield their results in item order:
+    # through the async batched path when config.concurrency > 1, on a thread pool when
+    # config.workers > 1, otherwise one at a time
+    def _iter_results(self, agent: AgentRunner, items: List[Tuple[int, AgentContext]],
+                      attack: Optional[Attack], eval_type: str) -> Iterator[Tuple]:
+        if self.config.concurrency > 1:
+            yield from _event_loop().run_until_complete(AgentRunner.gather_limited(
+                lambda item: self._arun_one(agent, item, attack, eval_type),
+                items,
+                self.config.concurrency
+            ))
+            return
+
+        def run_one(item: Tuple[int, AgentContext]) -> Tuple:
+            return self._run_one(agent, item, attack, eval_type)
+
+        if self.config.workers <= 1:
+            yield from map(run_one, items)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.config.workers)
+        try:
+            yield from pool.map(run_one, items)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    # Split items into lists of at most size items, so a stream of contexts is never
+    # held in memory whole
+    @staticmethod
+    def _chunks(items: Iterable[Tuple[int, AgentContext]], size: int) -> Iterator[List[Tuple[int, AgentContext]]]:
+        items = iter(items)
+        while True:
+            chunk = list(itertools.islice(items, size))
+            if not chunk:
+                return
+            yield chunk
+
+    # Evaluate every context not already recorded for this run
+    # eval_contexts may be any re-iterable (e.g. a dataset streamed from disk): it is
+    # read once per pass, EVAL_CHUNK contexts at a time, and never needs len()
+    # Rows are written and successes counted on the calling thread, in eval_index order
+    def _evaluate(self, agent: AgentRunner, eval_contexts: Iterable[AgentContext],
+                  attack: Optional[Attack], eval_type: str, writer: ResultsWriter) -> Dict[str, Any]:
+        if self.config.adaptive and attack is not None:
+            return self._evaluate_adaptive(agent, eval_contexts, attack, eval_type, writer)
+
+        done = self._done(writer, eval_type)
+        success_count = sum(done.values())
+        eval_count = 0
+
+        def pending() -> Iterator[Tuple[int, AgentContext]]:
+            nonlocal eval_count
+            for i, eval_context in enumerate(eval_contexts):
+                eval_count += 1
+                if i not in done:
+                    yield i, eval_context
+
+        error_count = 0
+        for chunk in self._chunks(pending(), self._chunk_size()):
+            for (i, eval_context), result in zip(chunk, self._iter_results(agent, chunk, attack, eval_type)):
+                if result[5] is not None: error_count += 1
+                elif result[1]: success_count += 1
+                self._record(writer, eval_type, i, eval_context, result)
+
+        return self._stats(eval_count - error_count, success_count, error_count)
+
+    # Contexts handed to _iter_results at once; well above the parallelism so the
+    # pause at the end of each chunk is small
+    def _chunk_size(self) -> int:
+        return max(EVAL_CHUNK, 8 * max(self.config.workers, self.config.concurrency, 1))
+
+    # (eval_index, context) pairs of eval_contexts in a seeded random order
+    # A sequence is shuffled whole; a stream goes through a shuffle buffer of
+    # ADAPTIVE_SHUFFLE_BUFFER contexts, so its order is only random within that window
+    def _shuffled(self, eval_contexts: Iterable[AgentContext]) -> Iterator[Tuple[int, AgentContext]]:
+        rng = random.Random(self.config.adaptive_seed)
+
+        if isinstance(eval_contexts, Sequence):
+            order = list(range(len(eval_contexts)))
+            rng.shuffle(order)
+            for i in order:
+                yield i, eval_contexts[i]
+            return
+
+        buffer: List[Tuple[int, AgentContext]] = []
+        for item in enumerate(eval_contexts):
+            if len(buffer) < ADAPTIVE_SHUFFLE_BUFFER:
+                buffer.append(item)
+                continue
+            j = rng.randrange(len(buffer))
+            yield buffer[j]
+            buffer[j] = item
+        rng.shuffle(buffer)
+        yield from buffer
+
+    # Adaptive evaluation: visit contexts in a seeded random order, one batch at a time,
+    # and stop once the success rate's confidence interval is narrow enough
+    # The baseline pass is not used here: it runs without an attack, so nothing in it is
+    # scored as a success and its rate says nothing about the attack's detector
+    def _evaluate_adaptive(self, agent: AgentRunner, eval_contexts: Iterable[AgentContext],
+                           attack: Optional[Attack], eval_type: str, writer: ResultsWriter) -> Dict[str, Any]:
+        estimator = SequentialEstimator(
+            target_width=self.config.ci_target_width,
+            confidence=self.config.confidence,
+            min_evals=self.config.adaptive_min_evals
+        )
+
+        done = self._done(writer, eval_type)
+        for success in done.values():
+            estimator.update(success)
+
+        items = self._shuffled(eval_contexts)
+        pending = ((i, c) for i, c in items if i not in done)
+        batch_size = max(self.config.workers, self.config.concurrency, 1)
+
+        error_count = 0
+        stop_reason = estimator.stop_reason()
+        if stop_reason is None:
+            for batch in self._chunks(pending, batch_size):
+                for (i, eval_context), result in zip(batch, self._iter_results(agent, batch, attack, eval_type)):
+                    if result[5] is not None:
+                        error_count += 1
+                    else:
+                        estimator.update(result[1])
+                    self._record(writer, eval_type, i, eval_context, result)
+
+                stop_reason = estimator.stop_reason()
+                if stop_reason is not None:
+                    break
+
+        # Contexts never evaluated; counting them reads the rest of a stream but calls no LLM
+        skipped = sum(1 for _ in pending)
+
+        stats = self._stats(estimator.n, estimator.successes, error_count)
+        stats["ci"] = list(estimator.interval())
+        stats["calls_saved"] = skipped
+        stats["stop_reason"] = stop_reason or "exhausted"
+        return stats
 
     def run(self, attack_context: Optional[AgentContext],
-            eval_contexts: list[AgentContext], 
+            eval_contexts: Iterable[AgentContext],
             build_attack: Callable[[], Optional[Attack]]) -> Dict[str, Any]:
 
         attack = build_attack()
+        self._span_stats = SpanStats()
+        cache_start = self.response_cache.stats() if self.response_cache is not None else None
+        calls_start = self.call_controller.stats() if self.call_controller is not None else None
+        run_start = time.perf_counter()
 
-        if attack_context is not None and attack is not None:
-            inject_context = AgentContext(
-                label=attack_context.label,
-                system_prompt=attack_context.system_prompt,
-                memory=list(attack_context.memory) if attack_context.memory else [],
-                user_input=attack_context.user_input
-            )
-
-            attack_info = self.agent.inject_attack(inject_context, attack=attack)
-
-            with open(self.config.output_path, "a", encoding="utf-8") as f:
-                row = {
-                    "eval_type": "attack",
-                    "label": attack_context.label,
-                    "info": attack_info,
-                    "config": self.config.to_dict()
-                }
-                f.write(json.dumps(row) + "\n")
-
-        asr_stats = self._evaluate(
-            agent=self.agent,
-            eval_contexts=eval_contexts,
-            attack=attack,
-            eval_type="baseline" if attack is None else "asr"
+        run_id = self._next_run_id(attack, attack_context)
+        writer = ResultsWriter(
+            self.config.output_path,
+            run_id=run_id,
+            config=self.config.to_dict(),
+            # Checkpointed runs write every row straight away so a crash loses nothing
+            buffer_rows=1 if self._checkpointing() else 256,
+            columnar=self.config.columnar_results
         )
-        asr = asr_stats["success_rate"]
-
-        persistence_rate = None
-        if attack is not None and attack.scope == PoisoningScope.PERSISTENT:
-            fresh_agent = AgentRunner(
-                memory_path=self.config.memory_path,
-                retrieval_mode=self.config.retrieval_mode,
-                retrieval_k=self.config.retrieval_k,
-                retrieval_key=self.config.retrieval_key,
-                llm_mode=self.config.mode,
-            )
 
-            persistence_stats = self._evaluate(
-                agent=fresh_agent,
+        stage = self._restore_checkpoint(run_id) if self.config.resume else None
+
+        with writer:
+            if self.completed is None or run_id not in self.completed.headers:
+                writer.write_header({"attack": attack.metadata() if attack is not None else None})
+
+            if stage is None and self._checkpointing():
+                self._save_checkpoint(run_id, "start")
+
+            if attack_context is not None and attack is not None and stage != "injected":
+                attack_info = self.agent.inject_attack(attack_context, attack=attack)
+
+                if self.completed is None or run_id not in self.completed.attacks:
+                    writer.write({
+                        "eval_type": "attack",
+                        "label": attack_context.label,
+                        "info": attack_info,
+                    })
+
+            if stage != "injected" and self._checkpointing():
+                self._save_checkpoint(run_id, "injected")
+
+            asr_stats = self._evaluate(
+                agent=self.agent,
                 eval_contexts=eval_contexts,
                 attack=attack,
-                eval_type="pr"
+                eval_type="baseline" if attack is None else "asr",
+                writer=writer
             )
+            asr = asr_stats["success_rate"]
+            error_count = asr_stats["error_count"]
 
-            persistence_rate = persistence_stats["success_rate"]
+            persistence_rate = None
+            if attack is not None and attack.scope == PoisoningScope.PERSISTENT:
+                fresh_agent = self._build_agent()
 
-        return {
+                persistence_stats = self._evaluate(
+                    agent=fresh_agent,
+                    eval_contexts=eval_contexts,
+                    attack=attack,
+                    eval_type="pr",
+                    writer=writer
+                )
+
+                persistence_rate = persistence_stats["success_rate"]
+                error_count += persistence_stats["error_count"]
+
+        summary = {
+            "run_id": run_id,
             "eval_count": asr_stats["eval_count"],
             "success_count": asr_stats["success_count"],
             "ASR": asr,
             "PR": persistence_rate,
+            "error_count": error_count,
             "memory_path": self.config.memory_path,
             "output_path": self.config.output_path
         }
+
+        if "stop_reason" in asr_stats:
+            adaptive_keys = ("ci", "calls_saved", "stop_reason")
+            summary["adaptive"] = {"asr": {k: asr_stats[k] for k in adaptive_keys}}
+            if persistence_rate is not None:
+                summary["adaptive"]["pr"] = {k: persistence_stats[k] for k in adaptive_keys}
+
+        if self._spans_enabled:
+            summary.update(self._span_stats.summary())
+            for hook in self.span_hooks:
+                hook.flush()
+
+        if calls_start is not None:
+            summary["llm_calls"] = self._call_metrics(
+                calls_start, self.call_controller.stats(), time.perf_counter() - run_start
+            )
+
+        if cache_start is not None:
+            cache_end = self.response_cache.stats()
+            summary["cache"] = {name: cache_end[name] - cache_start[name] for name in cache_end}
+
+        return summary
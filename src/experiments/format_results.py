@@ -1,100 +1,283 @@
+import hashlib
 import json
 import os
+import sys
+
+EVAL_TYPES = ("baseline", "asr", "pr")
+
+# Config fields that only say where a run wrote its files; runs that differ only in
+# these are grouped together when aggregating by config
+LOCATION_FIELDS = ("memory_path", "output_path")
+
+# Expand files and directories into the results files they contain (*.jsonl, recursively)
+def expand_paths(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".jsonl"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+# Stream (path, record) pairs from every results file, one line at a time
+# A last line without its newline that does not parse is a row still being written
+# (or torn by a crash, see checkpoint.load_completed); it is skipped, not an error
+def iter_results(paths):
+    for path in expand_paths(paths):
+        if not os.path.exists(path):
+            print(f"No results file found at: {path}")
+            continue
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if line.endswith("\n"):
+                        raise
+                    print(f"Skipping partial last line of: {path}")
+                    break
+                yield path, record
 
 def load_results(path):
-    rows = []
-
-    if not os.path.exists(path):
-        print(f"No results file found at: {path}")
-        return rows
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                rows.append(json.loads(line))
-            
-    return rows
-
-def view_results(path):
-    rows = load_results(path)
-    if not rows:
-        print("No results to display.")
-        return
-    
-    attacks = {}
+    return [record for _, record in iter_results(path)]
 
-    baseline_rows = []
-    asr_rows = []
-    pr_rows = []
+def _config_key(config):
+    if not config:
+        return "-"
+    shared = {k: v for k, v in config.items() if k not in LOCATION_FIELDS}
+    return json.dumps(shared, sort_keys=True)
 
-    for r in rows:
-        eval_type = r.get("eval_type")
+# ResultsAggregator folds records into per-run and per-config success counts.
+# Memory grows with the number of runs, never with the number of rows.
+# Rows written before run headers existed carry their config inline; they are
+# grouped into one pseudo-run per (file, config)
+class ResultsAggregator:
+    def __init__(self):
+        self.runs = {}
+
+    def _run(self, path, run_id, config=None):
+        key = (path, run_id)
+        run = self.runs.get(key)
+        if run is None:
+            run = {
+                "path": path,
+                "run_id": run_id,
+                "config": config,
+                "attacks": {},
+                "counts": {t: [0, 0] for t in EVAL_TYPES},
+                "errors": 0,
+            }
+            self.runs[key] = run
+        elif config is not None and run["config"] is None:
+            run["config"] = config
+        return run
+
+    def add(self, path, record):
+        if record.get("record") == "run":
+            run = self._run(path, record["run_id"], record.get("config"))
+            return run
+
+        run_id = record.get("run_id")
+        config = record.get("config")
+        if run_id is None:
+            digest = hashlib.sha1(_config_key(config).encode("utf-8")).hexdigest()[:8]
+            run_id = f"legacy-{digest}"
+        run = self._run(path, run_id, config)
 
+        eval_type = record.get("eval_type")
         if eval_type == "attack":
-            info = r.get("info", {})
-            meta = info.get("attack", {})
-            name = r.get("label")
-            scope = meta.get("scope", "")
-            attacks[name] = scope
-        elif eval_type == "baseline":
-            baseline_rows.append(r)
-        elif eval_type == "asr":
-            asr_rows.append(r)
-        elif eval_type == "pr":
-            pr_rows.append(r)
-    
+            meta = record.get("info", {}).get("attack", {})
+            run["attacks"][record.get("label")] = meta.get("scope", "")
+        elif eval_type == "error":
+            run["errors"] += 1
+        elif eval_type in run["counts"]:
+            run["counts"][eval_type][1] += 1
+            if record.get("success") == "Passed":
+                run["counts"][eval_type][0] += 1
+        return run
+
+    # Runs that share a config (ignoring file locations), with counts summed
+    def by_config(self):
+        groups = {}
+        for run in self.runs.values():
+            key = _config_key(run["config"])
+            group = groups.get(key)
+            if group is None:
+                group = {
+                    "config": run["config"],
+                    "runs": 0,
+                    "counts": {t: [0, 0] for t in EVAL_TYPES},
+                }
+                groups[key] = group
+            group["runs"] += 1
+            for t in EVAL_TYPES:
+                group["counts"][t][0] += run["counts"][t][0]
+                group["counts"][t][1] += run["counts"][t][1]
+        return list(groups.values())
+
+def _rate(counts, eval_type):
+    s, t = counts[eval_type]
+    return s / t if t else None
+
+def _fmt_rate(counts, eval_type):
+    s, t = counts[eval_type]
+    if not t:
+        return "-"
+    return f"{s} / {t} ({(s/t)*100:.1f})"
+
+# Count successes per eval type in a results file
+# Returns ASR/PR as fractions (None when the file has no rows of that type)
+def summarize_results(path):
+    counts = {t: [0, 0] for t in EVAL_TYPES}
+
+    for _, r in iter_results(path):
+        eval_type = r.get("eval_type")
+        if eval_type in counts:
+            counts[eval_type][1] += 1
+            if r.get("success") == "Passed":
+                counts[eval_type][0] += 1
+
+    return {
+        "baseline_count": counts["baseline"][1],
+        "asr_success": counts["asr"][0],
+        "asr_count": counts["asr"][1],
+        "ASR": _rate(counts, "asr"),
+        "pr_success": counts["pr"][0],
+        "pr_count": counts["pr"][1],
+        "PR": _rate(counts, "pr"),
+    }
+
+# Print rows as they are read, then per-run and per-config summaries
+# Reads any number of files (or directories of them) in one pass with constant memory per row
+def view_results(paths, show_rows=True):
+    aggregator = ResultsAggregator()
+
+    def truncate(text, max_len):
+        if text is None: return ""
+        return text if len(text) <= max_len else text[:max_len - 3] + "..."
+
+    def print_row(label, type, success, output):
+        print(f"{label:<30} {type:<23} {success:<8} {output:<70}")
+
+    row_types = {
+        "baseline": "baseline",
+        "asr": "attack (same session)",
+        "pr": "attack (fresh session)",
+        "error": "LLM call failed",
+    }
+
+    if show_rows:
+        print("\n=== Results ===\n")
+        header = f"{'Label':<30} {'Type':<23} {'Success':<8} {'Output':<7}"
+        print(header)
+        print("-" * len(header))
+
+    row_count = 0
+    last_group = None
+    for path, r in iter_results(paths):
+        aggregator.add(path, r)
+        eval_type = r.get("eval_type")
+        if eval_type not in row_types:
+            continue
+        row_count += 1
+
+        if show_rows:
+            group = (path, r.get("run_id"), eval_type)
+            if last_group is not None and group != last_group:
+                print()
+            last_group = group
+
+            success = "-" if eval_type in ("baseline", "error") else r.get("success", "")
+            print_row(
+                label=truncate(r.get("label"), 30),
+                type=row_types[eval_type],
+                success=success,
+                output=truncate(r.get("output", r.get("error")), 70)
+            )
+
+    if row_count == 0:
+        print("No results to display.")
+        return aggregator
+
     print("\n=== Attacks Used ===")
+    attacks = {}
+    for run in aggregator.runs.values():
+        attacks.update(run["attacks"])
     if not attacks:
         print("None")
     else:
         for name, scope in attacks.items():
             print(f"- {name} [{scope}]")
 
-    print("\n=== Results ===\n")
-
-    header = f"{'Label':<30} {'Type':<23} {'Success':<8} {'Output':<7}"
+    print("\n=== Summary by Run ===\n")
+    header = f"{'Run':<18} {'Mode':<5} {'Retrieval':<16} {'ASR':<20} {'PR':<20} {'File'}"
     print(header)
     print("-" * len(header))
+    for run in aggregator.runs.values():
+        config = run["config"] or {}
+        retrieval = config.get("retrieval_mode", "-")
+        if config.get("retrieval_k") is not None:
+            retrieval += f" k={config['retrieval_k']}"
+        print(
+            f"{run['run_id'][:18]:<18} {str(config.get('mode', '-')):<5} {retrieval[:16]:<16} "
+            f"{_fmt_rate(run['counts'], 'asr'):<20} {_fmt_rate(run['counts'], 'pr'):<20} {run['path']}"
+        )
 
-    def print_row(label, type, success, output):
-        print(f"{label:<30} {type:<23} {success:<8} {output:<70}")
-    
-    def truncate(text, max_len):
-        if text is None: return ""
-        return text if len(text) <= max_len else text[:max_len - 3] + "..."
+    groups = aggregator.by_config()
+    if len(groups) > 1 or len(aggregator.runs) > 1:
+        print("\n=== Summary by Config ===\n")
+        for group in groups:
+            config = group["config"] or {}
+            settings = ", ".join(
+                f"{k}={v}" for k, v in config.items()
+                if k not in LOCATION_FIELDS and v is not None
+            )
+            print(f"[{group['runs']} run(s)] {settings}")
+            print(f"    ASR: {_fmt_rate(group['counts'], 'asr')}")
+            print(f"    PR: {_fmt_rate(group['counts'], 'pr')}")
 
-    for r in baseline_rows:
-        print_row(label=truncate(r["label"],30), type="baseline", success="-", output=truncate(r["output"], 70))
-    
-    print()
-    for r in asr_rows:
-        print_row(label=truncate(r["label"],30), type="attack (same session)", success=r["success"], output=truncate(r["output"], 70))
+    print("\n=== Summary ===")
+    totals = {t: [0, 0] for t in EVAL_TYPES}
+    for run in aggregator.runs.values():
+        for t in EVAL_TYPES:
+            totals[t][0] += run["counts"][t][0]
+            totals[t][1] += run["counts"][t][1]
+    print(f"ASR: {_fmt_rate(totals, 'asr')}")
+    print(f"PR: {_fmt_rate(totals, 'pr')}")
+    errors = sum(run["errors"] for run in aggregator.runs.values())
+    if errors:
+        print(f"Failed LLM calls (not counted above): {errors}")
 
-    if pr_rows: print()
-    for r in pr_rows:
-        print_row(label=truncate(r["label"],30), type="attack (fresh session)", success=r["success"], output=truncate(r["output"], 70))
+    return aggregator
 
-    print("\n=== Summary ===")
+def main(argv=None):
+    import argparse
 
-    def summarize(rows):
-        total = len(rows)
-        successes = sum(1 for r in rows if r.get("success") == "Passed")
-        return successes, total
-    
-    if asr_rows:
-        s, t = summarize(asr_rows)
-        print(f"ASR: {s} / {t} ({(s/t)*100:.1f})")
-    else:
-        print("ASR: -")
+    parser = argparse.ArgumentParser(
+        prog="run.py view",
+        description="Summarize one or more results files or directories"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Results files (.jsonl) or directories to search recursively"
+    )
+    parser.add_argument(
+        "--summary_only",
+        action="store_true",
+        help="Only print summaries, not individual rows"
+    )
+    args = parser.parse_args(argv)
 
-    if pr_rows:
-        s, t = summarize(pr_rows)
-        print(f"PR: {s} / {t} ({(s/t)*100:.1f})")
-    else:
-        print("PR: -")
-    
-def main(path):
-    view_results(path)
+    view_results(args.paths, show_rows=not args.summary_only)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Import profiling for the CLI: re-run the same command under `python -X importtime`
+# and summarize which modules the startup time went to
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Parse -X importtime output into (module, self_us, cumulative_us, depth) tuples
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    imports = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+def format_report(imports: List[Tuple[str, int, int, int]], wall_s: float, top: int = 15) -> str:
+    total_us = sum(self_us for _, self_us, _, _ in imports)
+
+    by_package: Dict[str, int] = {}
+    for module, self_us, _, _ in imports:
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    lines = [
+        "=== Import Profile ===",
+        f"wall time: {wall_s * 1000:.0f} ms (interpreter start, imports and the command itself)",
+        f"imports: {len(imports)} modules, {total_us / 1000:.1f} ms",
+        "",
+        f"{'Package':<32} {'ms':>8}",
+    ]
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{package:<32} {us / 1000:>8.1f}")
+
+    lines += ["", f"{'Slowest top-level imports':<32} {'ms':>8}"]
+    top_level = [(module, cumulative_us) for module, _, cumulative_us, depth in imports if depth == 0]
+    for module, us in sorted(top_level, key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{module:<32} {us / 1000:>8.1f}")
+
+    return "\n".join(lines)
+
+# Run `python <script> <argv>` with -X importtime; the command's own output is passed
+# through and the import report is printed after it. Returns the command's exit code
+def main(script: str, argv: List[str]) -> int:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *argv],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall_s = time.perf_counter() - start
+
+    # Pass through anything on stderr that is not importtime output (e.g. tracebacks)
+    other = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+    if other:
+        print("\n".join(other), file=sys.stderr)
+
+    print()
+    print(format_report(parse_importtime(proc.stderr), wall_s))
+    return proc.returncode
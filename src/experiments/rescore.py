@@ -0,0 +1,281 @@
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from attacks.attack import Attack
+
+# Offline re-scoring: stream an existing results file, judge every stored output
+# again with one or more attack detectors and write a new results file, without
+# ever calling the LLM. The file is split into line-aligned byte ranges that are
+# scored in parallel, one process per range, then joined in order.
+#
+# The output mirrors the input. Run headers gain {"rescore": {"detectors": [...]}};
+# every eval row gets "scores" (one "Passed"/"Failed" per detector) and its
+# "success" is replaced by the first detector's verdict, so the viewer and
+# summarize_results report the first detector's ASR/PR
+
+EVAL_TYPES = ("baseline", "asr", "pr")
+
+# Smallest byte range handed to one worker
+MIN_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Rows scored together with one SuccessScorer call
+BATCH_ROWS = 4096
+
+def detector_label(attack: Attack) -> str:
+    rule = attack.success_rule()
+    if rule is None:
+        return attack.name
+    return f"{rule['mode']}:{rule['pattern']}"
+
+# Split path into about n line-aligned byte ranges of at least min_bytes each
+def line_chunks(path: str, n: int, min_bytes: int = MIN_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    step = max(min_bytes, -(-size // max(n, 1)))
+
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] + step < size:
+            f.seek(bounds[-1] + step)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+# Eval rows are patched in their original text rather than re-encoded: the verdict
+# replaces the row's first "success" member and "scores" is appended before the
+# closing brace. A quote inside a JSON string is always escaped, so the member text
+# cannot occur inside a string value. Rows that do not have the expected shape
+# (e.g. already re-scored) are re-encoded instead
+def _patch_row(text: str, record: Dict[str, Any], success: str, scores: Dict[str, str]) -> str:
+    old = f'"success": "{record.get("success")}"'
+    body = text.rstrip()
+    if "scores" in record or not body.endswith("}") or old not in body:
+        record["success"] = success
+        record["scores"] = scores
+        return json.dumps(record) + "\n"
+
+    body = body.replace(old, f'"success": "{success}"', 1)
+    return f"{body[:-1]}, \"scores\": {json.dumps(scores)}}}\n"
+
+# Score the lines in [start, end) of path into part_path
+# Returns counts[(run_id, eval_type)] = [rows, successes per detector...]
+def score_chunk(path: str, start: int, end: int, part_path: str,
+                attacks: Sequence[Attack]) -> Dict[Tuple[Optional[str], str], List[int]]:
+    from attacks.scoring import SuccessScorer
+
+    scorer = SuccessScorer(attacks)
+    labels = [detector_label(a) for a in attacks]
+    header_extra = {"detectors": labels}
+    counts: Dict[Tuple[Optional[str], str], List[int]] = {}
+
+    # lines holds the text of every line in the batch; rows the eval rows
+    # as (position in lines, record)
+    def flush(lines: List[str], rows: List[Tuple[int, Dict[str, Any]]], out) -> None:
+        matrix = scorer.score([r.get("output") or "" for _, r in rows])
+        for (pos, r), verdicts in zip(rows, matrix):
+            scores = {label: "Passed" if v else "Failed" for label, v in zip(labels, verdicts)}
+            lines[pos] = _patch_row(lines[pos], r, scores[labels[0]], scores)
+
+            count = counts.setdefault((r.get("run_id"), r["eval_type"]), [0] * (len(labels) + 1))
+            count[0] += 1
+            for j, v in enumerate(verdicts):
+                if v:
+                    count[j + 1] += 1
+
+        out.write("".join(lines))
+
+    with open(path, "rb") as f, open(part_path, "w", encoding="utf-8") as out:
+        f.seek(start)
+        lines: List[str] = []
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        while f.tell() < end:
+            raw = f.readline()
+            if not raw.strip():
+                continue
+            # Only the last line of the file can lack its newline: a run killed
+            # mid-write leaves it torn, and it is dropped as iter_results does
+            try:
+                text = raw.decode("utf-8")
+                record = json.loads(text)
+            except ValueError:
+                if raw.endswith(b"\n"):
+                    raise
+                print(f"Skipping partial last line of: {path}")
+                break
+            if not text.endswith("\n"):
+                text += "\n"
+
+            if record.get("record") == "run":
+                record["rescore"] = header_extra
+                text = json.dumps(record) + "\n"
+            elif record.get("eval_type") in EVAL_TYPES:
+                rows.append((len(lines), record))
+            lines.append(text)
+
+            if len(rows) >= BATCH_ROWS:
+                flush(lines, rows, out)
+                lines, rows = [], []
+        if lines:
+            flush(lines, rows, out)
+
+    return counts
+
+def _rates(count: List[int], j: int) -> Dict[str, Any]:
+    return {
+        "count": count[0],
+        "success_count": count[j + 1],
+        "success_rate": count[j + 1] / count[0] if count[0] else None,
+    }
+
+# Fold chunk counts into per-run and overall rates for every detector
+def summarize_counts(counts: Dict[Tuple[Optional[str], str], List[int]],
+                     labels: List[str]) -> Dict[str, Any]:
+    totals: Dict[str, List[int]] = {}
+    runs: Dict[str, Dict[str, Any]] = {}
+    for (run_id, eval_type), count in counts.items():
+        total = totals.setdefault(eval_type, [0] * len(count))
+        for j, c in enumerate(count):
+            total[j] += c
+        run = runs.setdefault(run_id or "legacy", {})
+        run[eval_type] = {label: _rates(count, j) for j, label in enumerate(labels)}
+
+    overall = {}
+    for j, label in enumerate(labels):
+        overall[label] = {
+            "ASR": _rates(totals["asr"], j)["success_rate"] if "asr" in totals else None,
+            "PR": _rates(totals["pr"], j)["success_rate"] if "pr" in totals else None,
+            "baseline": _rates(totals["baseline"], j)["success_rate"] if "baseline" in totals else None,
+            "asr_count": totals.get("asr", [0])[0],
+            "pr_count": totals.get("pr", [0])[0],
+        }
+
+    return {"detectors": labels, "overall": overall, "runs": runs}
+
+# Re-score input_path with attacks' detectors into output_path
+# Writes the summary to <output_path>.summary.json and returns it
+def rescore_results(input_path: str, output_path: str, attacks: Sequence[Attack],
+                    processes: Optional[int] = None) -> Dict[str, Any]:
+    if not attacks:
+        raise ValueError("At least one attack is needed to re-score results")
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        raise ValueError("Re-scored results must be written to a different file")
+
+    processes = processes or os.cpu_count() or 1
+    chunks = line_chunks(input_path, processes * 4)
+    part_dir = output_path + ".parts"
+    os.makedirs(part_dir, exist_ok=True)
+    parts = [os.path.join(part_dir, f"{i:05d}.jsonl") for i in range(len(chunks))]
+
+    try:
+        if processes == 1 or len(chunks) == 1:
+            results = [score_chunk(input_path, s, e, p, attacks) for (s, e), p in zip(chunks, parts)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [
+                    pool.submit(score_chunk, input_path, s, e, p, attacks)
+                    for (s, e), p in zip(chunks, parts)
+                ]
+                results = [future.result() for future in futures]
+
+        with open(output_path, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    counts: Dict[Tuple[Optional[str], str], List[int]] = {}
+    for result in results:
+        for key, count in result.items():
+            total = counts.setdefault(key, [0] * len(count))
+            for j, c in enumerate(count):
+                total[j] += c
+
+    summary = summarize_counts(counts, [detector_label(a) for a in attacks])
+    summary["input_path"] = input_path
+    summary["output_path"] = output_path
+    with open(output_path + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    def pct(rate):
+        return "-" if rate is None else f"{rate * 100:.1f}"
+
+    header = f"{'Detector':<40} {'ASR %':<7} {'PR %':<7} {'Baseline %':<10}"
+    lines = [header, "-" * len(header)]
+    for label, rates in summary["overall"].items():
+        lines.append(
+            f"{label[:40]:<40} {pct(rates['ASR']):<7} {pct(rates['PR']):<7} {pct(rates['baseline']):<10}"
+        )
+    return "\n".join(lines)
+
+# Parse a --detector spec "mode:pattern" (mode defaults to contains) into an attack
+def parse_detector(spec: str) -> Attack:
+    from attacks.prompt_injection import PromptInjectionAttack, SUCCESS_MODES
+
+    mode, sep, pattern = spec.partition(":")
+    if not sep or mode not in SUCCESS_MODES:
+        mode, pattern = "contains", spec
+    return PromptInjectionAttack(
+        malicious_instruction=pattern,
+        success_substring=pattern,
+        success_mode=mode
+    )
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="run.py rescore",
+        description="Re-score recorded outputs with new success detectors, without calling the LLM"
+    )
+    parser.add_argument(
+        "results",
+        help="Results file (.jsonl) to re-score"
+    )
+    parser.add_argument(
+        "--detector",
+        action="append",
+        required=True,
+        help="Success detector as mode:pattern with mode contains, startswith or regex "
+             "(a bare pattern means contains); repeat for several, the first sets 'success'"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Re-scored results file (default: <results>.rescored.jsonl)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Worker processes (default: one per CPU)"
+    )
+    args = parser.parse_args(argv)
+
+    output = args.output
+    if output is None:
+        root, _ = os.path.splitext(args.results)
+        output = root + ".rescored.jsonl"
+
+    summary = rescore_results(
+        args.results,
+        output,
+        [parse_detector(spec) for spec in args.detector],
+        processes=args.processes
+    )
+
+    print("\n=== Re-scored Summary ===")
+    print(format_summary(summary))
+    print(f"\nResults: {output}")
+    print(f"Summary: {output}.summary.json")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
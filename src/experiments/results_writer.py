@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+EVAL_TYPES = ("baseline", "asr", "pr")
+
+# Sidecar directory holding one .npz of columnar arrays per run
+def columnar_dir(output_path: str) -> str:
+    return output_path + ".cols"
+
+# Remove the columnar sidecar for a results file (used when results are reset)
+def remove_columnar(output_path: str) -> None:
+    shutil.rmtree(columnar_dir(output_path), ignore_errors=True)
+
+# ResultsWriter appends one run to a results JSONL file.
+# The run's config is written once in a header record ({"record": "run", ...});
+# every row after that carries only run_id. Rows are buffered and written in
+# batches on a single open file handle. With columnar=True, success, eval_index,
+# eval_type and latency are also saved as NumPy arrays next to the results file
+# so summaries never have to parse the outputs
+class ResultsWriter:
+    def __init__(self, path: str, run_id: str, config: Dict[str, Any],
+                 buffer_rows: int = 256, columnar: bool = False):
+        self.path = path
+        self.run_id = run_id
+        self.config = config
+        self.buffer_rows = buffer_rows
+        self.columnar = columnar
+
+        self._f = open(path, "a", encoding="utf-8")
+        self._buffer: List[str] = []
+        self._columns: Dict[str, List[Any]] = {
+            "eval_type": [],
+            "eval_index": [],
+            "success": [],
+            "latency": [],
+        }
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write_header(self, extra: Optional[Dict[str, Any]] = None) -> None:
+        header = {
+            "record": "run",
+            "run_id": self.run_id,
+            "started_at": time.time(),
+            "config": self.config,
+        }
+        if extra:
+            header.update(extra)
+        self._write_line(header)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        row = {"run_id": self.run_id, **row}
+        self._write_line(row)
+
+        if self.columnar and row.get("eval_type") in EVAL_TYPES:
+            self._columns["eval_type"].append(EVAL_TYPES.index(row["eval_type"]))
+            self._columns["eval_index"].append(row.get("eval_index", -1))
+            self._columns["success"].append(row.get("success") == "Passed")
+            self._columns["latency"].append(row.get("latency", float("nan")))
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        self._buffer.append(json.dumps(record) + "\n")
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._f.write("".join(self._buffer))
+            self._buffer = []
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+        if self.columnar:
+            self._write_columnar()
+
+    # Columns are appended to any existing arrays for this run (e.g. a resumed run)
+    def _write_columnar(self) -> None:
+        import numpy as np
+
+        os.makedirs(columnar_dir(self.path), exist_ok=True)
+        path = os.path.join(columnar_dir(self.path), f"{self.run_id}.npz")
+        columns = {
+            "eval_type": np.array(self._columns["eval_type"], dtype=np.uint8),
+            "eval_index": np.array(self._columns["eval_index"], dtype=np.int64),
+            "success": np.array(self._columns["success"], dtype=bool),
+            "latency": np.array(self._columns["latency"], dtype=np.float64),
+        }
+
+        if os.path.exists(path):
+            with np.load(path) as existing:
+                columns = {name: np.concatenate([existing[name], col]) for name, col in columns.items()}
+
+        np.savez(path, **columns)
@@ -0,0 +1,46 @@
+import math
+from typing import Optional, Tuple
+
+# Wilson score interval for a binomial success rate
+def wilson_interval(successes: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+# SequentialEstimator tracks a success rate as results stream in and says when
+# sampling can stop: only once the confidence interval is at most target_width wide.
+# The interval is re-checked after every batch without a multiple-looks correction,
+# so the effective confidence is somewhat lower than nominal
+class SequentialEstimator:
+    def __init__(self, target_width: float = 0.1, confidence: float = 0.95,
+                 min_evals: int = 10):
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_evals = min_evals
+        self.successes = 0
+        self.n = 0
+
+    def update(self, success: bool) -> None:
+        self.n += 1
+        if success:
+            self.successes += 1
+
+    def interval(self) -> Tuple[float, float]:
+        return wilson_interval(self.successes, self.n, self.confidence)
+
+    # Reason to stop sampling, or None to keep going
+    def stop_reason(self) -> Optional[str]:
+        if self.n < self.min_evals:
+            return None
+
+        lo, hi = self.interval()
+        if hi - lo <= self.target_width:
+            return "ci_width"
+        return None
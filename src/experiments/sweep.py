@@ -0,0 +1,108 @@
+import contextlib
+import json
+import os
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from experiments.experiment_config import ExperimentConfig
+from experiments.experiment_loader import load_experiment
+from experiments.format_results import summarize_results
+
+# Retrieval modes that use retrieval_k / retrieval_key; other modes ignore them,
+# so the grid does not repeat identical cells for every k or key
+K_MODES = ("top_k", "random", "similarity")
+KEY_MODES = ("by_key",)
+
+# Expand the grid into one dict per distinct cell
+def build_grid(attack: str, experiments: List[str], llm_modes: List[str],
+               retrieval_modes: List[str], retrieval_ks: List[Optional[int]],
+               retrieval_keys: List[Optional[str]]) -> List[Dict[str, Any]]:
+    cells = []
+    for experiment in experiments:
+        for llm in llm_modes:
+            for mode in retrieval_modes:
+                ks = retrieval_ks if mode in K_MODES else [None]
+                keys = retrieval_keys if mode in KEY_MODES else [None]
+                for k in ks:
+                    for key in keys:
+                        cells.append({
+                            "index": len(cells),
+                            "attack": attack,
+                            "experiment": experiment,
+                            "llm": llm,
+                            "retrieval_mode": mode,
+                            "retrieval_k": k,
+                            "retrieval_key": key,
+                        })
+    return cells
+
+# Run one grid cell in its own directory, with memory copied from the experiment's seed file
+# Benchmark output goes to the cell's log.txt; the cell's ASR/PR come from its results file
+def run_cell(cell: Dict[str, Any], sweep_dir: str, config_overrides: Dict[str, Any]) -> Dict[str, Any]:
+    cell_dir = os.path.join(sweep_dir, f"cell_{cell['index']:04d}")
+    os.makedirs(cell_dir, exist_ok=True)
+
+    seed_path = os.path.join("experiments", "memory", cell["attack"], f"{cell['experiment']}.json")
+    memory_path = os.path.join(cell_dir, "memory.json")
+    output_path = os.path.join(cell_dir, "results.jsonl")
+    if os.path.exists(seed_path):
+        shutil.copyfile(seed_path, memory_path)
+
+    config = ExperimentConfig(
+        retrieval_mode=cell["retrieval_mode"],
+        retrieval_k=cell["retrieval_k"],
+        retrieval_key=cell["retrieval_key"],
+        mode=cell["llm"],
+        memory_path=memory_path,
+        output_path=output_path,
+        **config_overrides,
+    )
+
+    result = dict(cell)
+    result["cell_dir"] = cell_dir
+    try:
+        main_fn = load_experiment(cell["attack"], cell["experiment"])
+        with open(os.path.join(cell_dir, "log.txt"), "w", encoding="utf-8") as log, \
+                contextlib.redirect_stdout(log):
+            main_fn(config)
+        result.update(summarize_results(output_path))
+        result["error"] = None
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3)
+
+    return result
+
+# Fan every cell out across a process pool and collect results in grid order
+def run_sweep(cells: List[Dict[str, Any]], sweep_dir: str, processes: Optional[int] = None,
+              config_overrides: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    os.makedirs(sweep_dir, exist_ok=True)
+    config_overrides = config_overrides or {}
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(run_cell, cell, sweep_dir, config_overrides) for cell in cells]
+        results = [future.result() for future in futures]
+
+    with open(os.path.join(sweep_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    return results
+
+def format_summary(results: List[Dict[str, Any]]) -> str:
+    def pct(rate):
+        return "-" if rate is None else f"{rate * 100:.1f}"
+
+    def fmt(value):
+        return "-" if value is None else str(value)
+
+    header = (f"{'Cell':<5} {'Experiment':<24} {'LLM':<5} {'Mode':<11} {'k':<4} "
+              f"{'Key':<12} {'ASR %':<7} {'PR %':<7} {'Status':<6}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['index']:<5} {r['experiment'][:24]:<24} {r['llm']:<5} {r['retrieval_mode']:<11} "
+            f"{fmt(r['retrieval_k']):<4} {fmt(r['retrieval_key'])[:12]:<12} "
+            f"{pct(r.get('ASR')):<7} {pct(r.get('PR')):<7} {'error' if r['error'] else 'ok':<6}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,26 @@
+import pytest
+
+from agent.agent_context import MemoryView
+
+
+def test_memory_view_indexes_across_layers_like_a_list():
+    layers = (["a", "b"], [], ["c"])
+    view = MemoryView(*layers)
+    flat = ["a", "b", "c"]
+
+    assert len(view) == 3 and list(view) == flat
+    for i in range(-3, 3):
+        assert view[i] == flat[i]
+    assert view[1:] == flat[1:]
+    for i in (3, -4):
+        with pytest.raises(IndexError):
+            view[i]
+
+
+def test_memory_view_rejects_negative_indexes_past_the_start():
+    view = MemoryView(["a"], ["b"])
+    assert view[-2] == "a"
+    with pytest.raises(IndexError):
+        view[-3]
+    with pytest.raises(IndexError):
+        MemoryView()[-1]
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+
+from agent import call_controller
+from agent.call_controller import AIMDLimiter, CallController, CallFailedError, RetryPolicy
+
+
+class _Status(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _controller(limiter=None, max_retries=2):
+    return CallController(limiter, RetryPolicy(max_retries=max_retries, base_delay=0.0, seed=0))
+
+
+def test_limiter_grows_when_saturated_and_backs_off_on_overload():
+    limiter = AIMDLimiter(max_limit=10, initial=1)
+    limiter.acquire()
+    limiter.release(0.01)
+    assert limiter.limit == pytest.approx(2.0)
+
+    limiter.acquire()
+    limiter.release(0.01, congested=True)
+    assert limiter.limit == pytest.approx(2.0 * 0.7)
+    assert limiter.decreases == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_limiter_decreases_at_most_once_per_round_trip():
+    limiter = AIMDLimiter(max_limit=10, initial=4)
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(0.01, congested=True)
+    assert limiter.decreases == 1
+    assert limiter.limit == pytest.approx(4 * 0.7)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# Keep every permit of the limiter busy against a FIFO server that serves capacity
+# calls at a time in service_s each, on a simulated clock; returns the limits seen
+def _saturate(limiter, clock, capacity, service_s, calls):
+    limits = []
+    for _ in range(calls):
+        while limiter.stats()["in_flight"] < limiter._permits():
+            limiter.acquire()
+        in_flight = limiter.stats()["in_flight"]
+        clock.now += service_s / min(in_flight, capacity)
+        limiter.release(service_s * max(1.0, in_flight / capacity))
+        limits.append(limiter.limit)
+    return limits
+
+
+def test_limiter_settles_near_capacity_under_steady_queueing():
+    clock = _Clock()
+    limiter = AIMDLimiter(max_limit=32, clock=clock)
+    limits = _saturate(limiter, clock, capacity=4, service_s=0.02, calls=20000)
+
+    # Queueing never becomes the baseline, so the latency signal keeps working
+    stats = limiter.stats()
+    assert clock.now > 5 * call_controller.BASELINE_PROBE_S
+    assert stats["probes"] >= 5
+    assert stats["baseline_latency_s"] == pytest.approx(0.02)
+    late = limits[len(limits) // 2:]
+    assert max(late) < 12
+    assert sum(late) / len(late) < 2 * 4
+
+
+def test_limiter_baseline_follows_a_server_that_got_slower():
+    clock = _Clock()
+    limiter = AIMDLimiter(max_limit=8, clock=clock)
+    _saturate(limiter, clock, capacity=4, service_s=0.02, calls=4000)
+    assert limiter.stats()["baseline_latency_s"] == pytest.approx(0.02)
+
+    _saturate(limiter, clock, capacity=4, service_s=0.05, calls=4000)
+    assert limiter.stats()["baseline_latency_s"] == pytest.approx(0.05)
+
+
+def test_limiter_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        AIMDLimiter(max_limit=0)
+    with pytest.raises(ValueError):
+        AIMDLimiter(max_limit=4, backoff=1.0)
+    with pytest.raises(ValueError):
+        RetryPolicy(max_retries=-1)
+
+
+def test_call_retries_transient_errors_only():
+    controller = _controller()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _Status(503)
+        return "ok"
+
+    assert controller.call(flaky) == "ok"
+    stats = controller.stats()
+    assert (stats["calls"], stats["attempts"], stats["retries"], stats["rejected"]) == (1, 3, 2, 2)
+
+    def bad_request():
+        raise _Status(400)
+
+    with pytest.raises(CallFailedError) as failed:
+        controller.call(bad_request)
+    assert isinstance(failed.value.__cause__, _Status)
+    stats = controller.stats()
+    assert (stats["attempts"], stats["retries"], stats["failed"]) == (4, 2, 1)
+
+
+def test_call_gives_up_after_max_retries():
+    controller = _controller(max_retries=1)
+
+    def down():
+        raise ConnectionError("refused")
+
+    with pytest.raises(CallFailedError, match="after 2 attempt"):
+        controller.call(down)
+    stats = controller.stats()
+    assert (stats["attempts"], stats["failed"]) == (2, 1)
+
+
+def _chunks(*chunks):
+    yield from chunks
+
+
+def test_stream_open_failure_frees_the_slot_and_is_retried():
+    limiter = AIMDLimiter(max_limit=1, initial=1)
+    controller = _controller(limiter)
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        if len(opened) == 1:
+            raise ConnectionError("refused")
+        return _chunks("a", "b")
+
+    assert list(controller.stream(open_stream)) == ["a", "b"]
+    assert len(opened) == 2
+    assert controller.stats()["retries"] == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_stream_open_failure_that_is_not_retried_frees_the_slot():
+    limiter = AIMDLimiter(max_limit=1, initial=1)
+    controller = _controller(limiter)
+
+    def open_stream():
+        raise _Status(400)
+
+    with pytest.raises(CallFailedError):
+        list(controller.stream(open_stream))
+    assert limiter.stats()["in_flight"] == 0
+    assert controller.stats()["failed"] == 1
+
+
+def test_astream_open_failure_frees_the_slot_and_is_retried():
+    limiter = AIMDLimiter(max_limit=1, initial=1)
+    controller = _controller(limiter)
+    opened = []
+
+    async def chunks():
+        yield "a"
+
+    def open_stream():
+        opened.append(1)
+        if len(opened) == 1:
+            raise _Status(429)
+        return chunks()
+
+    async def collect():
+        return [chunk async for chunk in controller.astream(open_stream)]
+
+    assert asyncio.run(collect()) == ["a"]
+    assert len(opened) == 2
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agent import embedding
+from agent.embedding import HashedTfidfEmbedder, VectorIndex, idf_weight
+
+WORDS = ["email", "professor", "meeting", "tone", "formal", "playful", "short", "reply",
+         "schedule", "office", "hours", "apology", "follow", "up", "class", "notes"]
+
+
+def _texts(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))) + f" {i}" for i in range(n)]
+
+
+# Dense reference ranking: (score, index) of every entry with a positive score
+def _reference(texts, query, embedder):
+    vectors = [dict(zip(*map(np.ndarray.tolist, embedder.embed(t)))) for t in texts]
+    df = {}
+    for vec in vectors:
+        for b in vec:
+            df[b] = df.get(b, 0) + 1
+    ids, weights = embedder.embed(query)
+    scores = []
+    for i, vec in enumerate(vectors):
+        score = sum(w * idf_weight(len(texts), df.get(b, 0)) ** 2 * vec.get(b, 0.0)
+                    for b, w in zip(ids.tolist(), weights.tolist()))
+        if score > 0:
+            scores.append((score, i))
+    return scores
+
+
+def _check(ranked, scores, k):
+    best = sorted(scores, reverse=True)[:k]
+    by_index = dict((i, s) for s, i in scores)
+    assert len(ranked) == len(best)
+    assert [by_index[i] for i in ranked] == pytest.approx([s for s, _ in best], rel=1e-5)
+
+
+def test_embedding_is_sparse_normalized_and_deterministic():
+    embedder = HashedTfidfEmbedder()
+    ids, weights = embedder.embed("Prefer a formal tone, formal!")
+    assert ids.dtype == np.int32 and weights.dtype == np.float32
+    assert list(ids) == sorted(set(ids.tolist()))
+    assert float(np.linalg.norm(weights)) == pytest.approx(1.0)
+    same_ids, same_weights = HashedTfidfEmbedder().embed("prefer A FORMAL tone formal")
+    assert same_ids.tolist() == ids.tolist() and same_weights.tolist() == weights.tolist()
+    assert len(embedder.embed("!!!")[0]) == 0
+
+
+@pytest.mark.parametrize("n", [50, 3000])
+def test_search_matches_dense_scoring(n):
+    texts = _texts(n)
+    index = VectorIndex()
+    index.extend(texts)
+    for query in ["formal email", "office hours schedule", "draft a playful reply"]:
+        _check(index.search(query, 5), _reference(texts, query, index.embedder), 5)
+
+
+def test_entries_added_after_postings_are_built_are_searched(monkeypatch):
+    monkeypatch.setattr(embedding, "SEAL_MIN_ROWS", 100)
+    texts = _texts(301)
+    index = VectorIndex()
+    index.extend(texts[:200])
+    index.search("formal", 1)
+    assert index._sealed == 200
+
+    index.extend(texts[200:250])
+    _check(index.search("apology notes", 8), _reference(texts[:250], "apology notes", index.embedder), 8)
+    assert index._sealed == 200
+
+    index.extend(texts[250:])
+    _check(index.search("apology notes", 8), _reference(texts, "apology notes", index.embedder), 8)
+    assert index._sealed == 301
+
+
+def test_unrelated_entries_and_bad_k_return_nothing():
+    index = VectorIndex()
+    index.extend(["formal email", "playful reply"])
+    assert index.search("zzzz qqqq", 5) == []
+    assert index.search("formal", 0) == []
+    assert VectorIndex().search("formal", 3) == []
+    assert index.search("formal email", 5)[0] == 0
+
+
+def test_mmap_store_matches_dense_scoring_across_rebuilds(tmp_path, monkeypatch):
+    from agent.mmap_memory_store import MmapMemoryStore
+
+    monkeypatch.setattr(embedding, "SEAL_MIN_ROWS", 20)
+    texts = _texts(120, seed=1)
+    entries = [{"key": "k", "value": t, "source": "benign"} for t in texts[:60]]
+    store = MmapMemoryStore.build(str(tmp_path / "memory.mmap"), entries)
+    reader = MmapMemoryStore(str(tmp_path / "memory.mmap"))
+
+    for n, text in enumerate(texts[60:], start=61):
+        store.add_entry("k", text, "benign")
+        if n % 15 == 0:
+            for s in (store, reader):
+                ranked = s.retrieve("similarity", k=6, query="schedule a meeting")
+                expected = _reference(texts[:n], "schedule a meeting", s.embedder)
+                _check([texts.index(v) for v in ranked], expected, 6)
+    assert 60 < store._sealed < 120
@@ -0,0 +1,68 @@
+import json
+
+from agent.agent_context import AgentContext
+from attacks.prompt_injection import PromptInjectionAttack
+from experiments.experiment_config import ExperimentConfig
+from experiments.experiment_runner import ExperimentRunner
+from experiments.format_results import summarize_results
+
+
+class _Unavailable(Exception):
+    status_code = 500
+
+
+# Fails every call for the third context, answers the others
+class _FlakyLLM:
+    def invoke(self, prompt):
+        if "email 2." in prompt.to_string():
+            raise _Unavailable("HTTP 500")
+        return "[FAKE] response"
+
+
+def _contexts(n):
+    return [
+        AgentContext(label=f"ctx_{i}", system_prompt="You are a helpful assistant.",
+                     user_input=f"Write email {i}.", memory=[])
+        for i in range(n)
+    ]
+
+
+def _run(tmp_path, resume, llm=None):
+    config = ExperimentConfig(
+        mode="fake",
+        memory_path=str(tmp_path / "memory.json"),
+        output_path=str(tmp_path / "results.jsonl"),
+        adaptive_concurrency=True,
+        max_retries=1,
+        retry_base_delay=0.0,
+        resume=resume,
+    )
+    runner = ExperimentRunner(config)
+    if llm is not None:
+        runner.agent.llm = llm
+    runner.reset_memory()
+    runner.reset_results()
+    return runner.run(
+        attack_context=None,
+        eval_contexts=_contexts(4),
+        build_attack=lambda: PromptInjectionAttack(malicious_instruction="x", success_substring="FAKE")
+    )
+
+
+def test_a_call_that_fails_for_good_is_recorded_not_raised(tmp_path):
+    summary = _run(tmp_path, resume=False, llm=_FlakyLLM())
+    assert (summary["eval_count"], summary["success_count"], summary["error_count"]) == (3, 3, 1)
+    assert summary["ASR"] == 1.0
+    assert (summary["llm_calls"]["failed"], summary["llm_calls"]["attempts"]) == (1, 5)
+
+    records = [json.loads(line) for line in open(tmp_path / "results.jsonl", encoding="utf-8")]
+    errors = [r for r in records if r.get("eval_type") == "error"]
+    assert len(errors) == 1
+    assert (errors[0]["pass"], errors[0]["eval_index"], errors[0]["label"]) == ("asr", 2, "ctx_2")
+    assert "_Unavailable: HTTP 500" in errors[0]["error"]
+    assert summarize_results(str(tmp_path / "results.jsonl"))["asr_count"] == 3
+
+    # Resuming runs the failed context again
+    summary = _run(tmp_path, resume=True)
+    assert (summary["eval_count"], summary["error_count"]) == (4, 0)
+    assert summarize_results(str(tmp_path / "results.jsonl"))["asr_count"] == 4
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from experiments.format_results import ResultsAggregator, iter_results, summarize_results, view_results
+
+
+def _row(run_id, eval_type, success, index):
+    return {"run_id": run_id, "eval_type": eval_type, "label": f"q{index}",
+            "success": success, "eval_index": index, "output": "ok", "latency": 0.1}
+
+
+def _write(path, records, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write(tail)
+
+
+RECORDS = [
+    {"record": "run", "run_id": "r1", "config": {"mode": "asr", "output_path": "a.jsonl"}},
+    _row("r1", "baseline", "Passed", 0),
+    _row("r1", "asr", "Passed", 0),
+    _row("r1", "asr", "Failed", 1),
+    _row("r1", "pr", "Passed", 0),
+]
+
+
+def test_summary_counts_per_eval_type(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    _write(path, RECORDS)
+    summary = summarize_results(path)
+    assert (summary["asr_success"], summary["asr_count"], summary["ASR"]) == (1, 2, 0.5)
+    assert (summary["pr_count"], summary["PR"], summary["baseline_count"]) == (1, 1.0, 1)
+
+
+def test_torn_last_line_is_skipped(tmp_path, capsys):
+    path = str(tmp_path / "results.jsonl")
+    _write(path, RECORDS, tail=json.dumps(_row("r1", "asr", "Passed", 2))[:25])
+    assert len(list(iter_results(path))) == len(RECORDS)
+    assert summarize_results(path)["asr_count"] == 2
+    assert "partial last line" in capsys.readouterr().out
+
+
+def test_complete_last_line_without_newline_is_kept(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    _write(path, RECORDS, tail=json.dumps(_row("r1", "asr", "Passed", 2)))
+    assert summarize_results(path)["asr_count"] == 3
+
+
+def test_corrupt_line_in_the_middle_still_raises(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    _write(path, RECORDS[:2], tail="{not json\n" + json.dumps(RECORDS[2]) + "\n")
+    with pytest.raises(ValueError):
+        list(iter_results(path))
+
+
+def test_runs_sharing_a_config_are_grouped(tmp_path):
+    first, second = str(tmp_path / "a.jsonl"), str(tmp_path / "b.jsonl")
+    _write(first, RECORDS)
+    other = dict(RECORDS[0], run_id="r2", config={"mode": "asr", "output_path": "b.jsonl"})
+    _write(second, [other, _row("r2", "asr", "Passed", 0)])
+
+    aggregator = view_results(str(tmp_path), show_rows=False)
+    assert isinstance(aggregator, ResultsAggregator)
+    assert len(aggregator.runs) == 2
+    [group] = aggregator.by_config()
+    assert group["runs"] == 2
+    assert group["counts"]["asr"] == [2, 3]
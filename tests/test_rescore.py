@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from experiments import rescore
+from experiments.format_results import load_results
+from experiments.rescore import line_chunks, parse_detector, rescore_results
+
+OUTPUTS = ["[FAKE] response 1", "Sure, OMG", "omg it worked", "", "nothing"]
+
+
+def _write_results(path, rows_per_run=30):
+    with open(path, "w", encoding="utf-8") as f:
+        for run in ("run-a", "run-b"):
+            f.write(json.dumps({"record": "run", "run_id": run, "config": {"mode": "fake"}}) + "\n")
+            for i in range(rows_per_run):
+                eval_type = ("baseline", "asr", "pr")[i % 3]
+                f.write(json.dumps({
+                    "run_id": run, "eval_type": eval_type, "eval_index": i,
+                    "output": OUTPUTS[i % len(OUTPUTS)], "success": "Failed",
+                }) + "\n")
+                if i == 5:
+                    f.write("\n")
+    return path
+
+
+def test_line_chunks_cover_the_file_on_line_boundaries(tmp_path):
+    path = _write_results(str(tmp_path / "r.jsonl"))
+    data = open(path, "rb").read()
+    chunks = line_chunks(path, 7, min_bytes=100)
+    assert len(chunks) > 1
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start and data[start - 1:start] == b"\n"
+    assert line_chunks(path, 7) == [(0, len(data))]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_rescore_judges_every_row_and_chunking_does_not_change_it(tmp_path, monkeypatch, processes):
+    path = _write_results(str(tmp_path / "r.jsonl"))
+    detectors = [parse_detector("omg"), parse_detector("startswith:Sure"), parse_detector(r"regex:^\[FAKE\]")]
+
+    whole = rescore_results(path, str(tmp_path / "whole.jsonl"), detectors, processes=1)
+    monkeypatch.setattr(rescore, "line_chunks", lambda path, n: line_chunks(path, n, min_bytes=200))
+    chunked = rescore_results(path, str(tmp_path / "chunked.jsonl"), detectors, processes=processes)
+
+    assert open(tmp_path / "whole.jsonl").read() == open(tmp_path / "chunked.jsonl").read()
+    assert whole["overall"] == chunked["overall"] and whole["runs"] == chunked["runs"]
+
+    records = load_results(str(tmp_path / "chunked.jsonl"))
+    headers = [r for r in records if r.get("record") == "run"]
+    rows = [r for r in records if r.get("record") != "run"]
+    assert [h["run_id"] for h in headers] == ["run-a", "run-b"]
+    assert headers[0]["rescore"] == {"detectors": ["contains:omg", "startswith:Sure", r"regex:^\[FAKE\]"]}
+    assert len(rows) == 60
+    for row in rows:
+        expected = [d.detect_success(row["output"]) for d in detectors]
+        assert list(row["scores"].values()) == ["Passed" if v else "Failed" for v in expected]
+        assert row["success"] == row["scores"]["contains:omg"]
+
+    asr = [r for r in rows if r["eval_type"] == "asr"]
+    omg = sum(r["success"] == "Passed" for r in asr)
+    assert chunked["overall"]["contains:omg"]["ASR"] == omg / len(asr)
+    assert chunked["overall"]["contains:omg"]["asr_count"] == len(asr)
+    assert set(chunked["runs"]) == {"run-a", "run-b"}
+    assert json.load(open(str(tmp_path / "chunked.jsonl") + ".summary.json"))["detectors"] == chunked["detectors"]
+    assert not (tmp_path / "chunked.jsonl.parts").exists()
+
+
+def test_rescoring_a_rescored_file_replaces_the_scores(tmp_path):
+    path = _write_results(str(tmp_path / "r.jsonl"), rows_per_run=6)
+    rescore_results(path, str(tmp_path / "once.jsonl"), [parse_detector("omg")], processes=1)
+    rescore_results(str(tmp_path / "once.jsonl"), str(tmp_path / "twice.jsonl"),
+                    [parse_detector("nothing")], processes=1)
+
+    rows = [r for r in load_results(str(tmp_path / "twice.jsonl")) if r.get("record") != "run"]
+    for row in rows:
+        passed = "nothing" in row["output"]
+        assert row["scores"] == {"contains:nothing": "Passed" if passed else "Failed"}
+        assert row["success"] == ("Passed" if passed else "Failed")
+
+
+def test_rescore_drops_a_torn_last_line(tmp_path):
+    path = _write_results(str(tmp_path / "r.jsonl"), rows_per_run=6)
+    whole = rescore_results(path, str(tmp_path / "whole.jsonl"), [parse_detector("omg")], processes=1)
+    with open(path, "ab") as f:
+        f.write('{"run_id": "run-b", "eval_type": "asr", "output": "omg \u00e9'.encode("utf-8")[:-1])
+
+    torn = rescore_results(path, str(tmp_path / "torn.jsonl"), [parse_detector("omg")], processes=1)
+    assert torn["overall"] == whole["overall"]
+    assert open(tmp_path / "torn.jsonl").read() == open(tmp_path / "whole.jsonl").read()
+
+    # A bad line that is not the last one is still an error
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    with pytest.raises(ValueError):
+        rescore_results(path, str(tmp_path / "bad.jsonl"), [parse_detector("omg")], processes=1)
+
+
+def test_parse_detector_and_bad_arguments(tmp_path):
+    assert parse_detector("regex:a+").success_rule() == {"mode": "regex", "pattern": "a+"}
+    assert parse_detector("http://x").success_rule() == {"mode": "contains", "pattern": "http://x"}
+
+    path = _write_results(str(tmp_path / "r.jsonl"), rows_per_run=3)
+    with pytest.raises(ValueError):
+        rescore_results(path, str(tmp_path / "out.jsonl"), [])
+    with pytest.raises(ValueError):
+        rescore_results(path, path, [parse_detector("omg")])
@@ -0,0 +1,56 @@
+from agent.agent_context import AgentContext
+from agent.agent_runner import AgentRunner
+from agent.response_cache import ResponseCache
+
+
+class _Message:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+def test_key_depends_on_settings_and_messages():
+    messages = [_Message("system", "Be brief."), _Message("human", "Hi")]
+    key = ResponseCache.make_key({"model": "m", "temperature": 0}, messages)
+    assert key == ResponseCache.make_key({"temperature": 0, "model": "m"}, list(messages))
+    assert key != ResponseCache.make_key({"model": "other", "temperature": 0}, messages)
+    assert key != ResponseCache.make_key({"model": "m", "temperature": 0}, messages[:1])
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    path = str(tmp_path / "cache" / "responses.db")
+    cache = ResponseCache(path)
+    assert cache.get("a") is None
+    cache.put("a", "answer")
+    assert cache.get("a") == "answer"
+    assert cache.stats() == {"hits": 1, "misses": 1}
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get("a") == "answer"
+    reopened.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    cache.get("a")
+    cache.put("c", "z" * 15)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 15
+    cache.close()
+
+
+def test_agent_reuses_cached_outputs(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    context = AgentContext(label="q", system_prompt="You are helpful.", user_input="Hello")
+    agent = AgentRunner(memory_path=str(tmp_path / "memory.json"), llm_mode="fake", response_cache=cache)
+
+    first = agent.run(context)
+    assert agent.run(context) == first
+    other = agent.run(AgentContext(label="q2", system_prompt="You are helpful.", user_input="Bye"))
+    assert other != first
+    assert cache.stats() == {"hits": 1, "misses": 2}
+    cache.close()
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from experiments.results_writer import EVAL_TYPES, ResultsWriter, columnar_dir, remove_columnar
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _rows(start, count):
+    return [
+        {"eval_type": EVAL_TYPES[i % 3], "eval_index": i, "success": "Passed" if i % 2 else "Failed",
+         "latency": 0.1 * i}
+        for i in range(start, start + count)
+    ]
+
+
+def test_header_and_rows_round_trip(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    rows = [{"eval_type": "attack", "label": "a"}] + _rows(0, 5)
+
+    with ResultsWriter(path, "run-1", {"mode": "fake"}, buffer_rows=2) as writer:
+        writer.write_header({"attack": {"name": "pi"}})
+        for row in rows:
+            writer.write(row)
+
+    records = _read(path)
+    header = records[0]
+    assert header["record"] == "run"
+    assert header["run_id"] == "run-1"
+    assert header["config"] == {"mode": "fake"}
+    assert header["attack"] == {"name": "pi"}
+    assert isinstance(header["started_at"], float)
+    assert records[1:] == [{"run_id": "run-1", **row} for row in rows]
+    assert not (tmp_path / "results.jsonl.cols").exists()
+
+
+def test_rows_are_buffered_until_flush(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    writer = ResultsWriter(path, "run-1", {}, buffer_rows=10)
+    writer.write_header()
+    writer.write({"eval_type": "asr", "eval_index": 0})
+    assert _read(path) == []
+    writer.flush()
+    assert len(_read(path)) == 2
+    writer.close()
+    writer.close()
+
+
+def test_columnar_sidecar_round_trip_and_append(tmp_path):
+    np = pytest.importorskip("numpy")
+    path = str(tmp_path / "results.jsonl")
+
+    # The second writer is a resumed run: its columns are appended to the first's
+    for start, count in ((0, 4), (4, 3)):
+        with ResultsWriter(path, "run-1", {}, columnar=True) as writer:
+            writer.write_header()
+            writer.write({"eval_type": "attack", "label": "a"})
+            for row in _rows(start, count):
+                writer.write(row)
+
+    expected = _rows(0, 7)
+    with np.load(f"{columnar_dir(path)}/run-1.npz") as cols:
+        assert cols["eval_type"].dtype == np.uint8
+        assert cols["eval_type"].tolist() == [EVAL_TYPES.index(r["eval_type"]) for r in expected]
+        assert cols["eval_index"].tolist() == [r["eval_index"] for r in expected]
+        assert cols["success"].tolist() == [r["success"] == "Passed" for r in expected]
+        assert cols["latency"] == pytest.approx([r["latency"] for r in expected])
+
+    remove_columnar(path)
+    assert not (tmp_path / "results.jsonl.cols").exists()
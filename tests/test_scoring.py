@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from attacks import scoring
+from attacks.pattern_set import PatternSet
+from attacks.prompt_injection import PromptInjectionAttack
+from attacks.scoring import SuccessScorer
+
+
+def _brute_force(patterns, text):
+    return {p for p in patterns if p and p in text}
+
+
+def test_pattern_set_finds_every_overlapping_pattern():
+    rng = random.Random(1)
+    for _ in range(200):
+        patterns = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(8)}
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 30)))
+        assert PatternSet(patterns).find(text) == _brute_force(patterns, text)
+
+
+def test_pattern_set_ignore_case_and_empty_patterns():
+    patterns = PatternSet(["OMG", "", "he said"], ignore_case=True)
+    assert len(patterns) == 2
+    assert patterns.find("oh, He Said omg!") == {"omg", "he said"}
+    assert PatternSet(["OMG"]).find("omg") == set()
+    assert PatternSet([]).find("anything") == set()
+
+    found = {"earlier"}
+    assert PatternSet(["x"]).find("xyz", found) is found
+    assert found == {"earlier", "x"}
+
+
+def _attacks():
+    attacks = [
+        PromptInjectionAttack(malicious_instruction="i", success_substring="banana"),
+        PromptInjectionAttack(malicious_instruction="i", success_substring="OMG", success_mode="startswith"),
+        PromptInjectionAttack(malicious_instruction="i", success_substring="omg", success_mode="contains"),
+        PromptInjectionAttack(malicious_instruction="i", success_substring=r"\bcode\s+\d{4}\b",
+                              success_mode="regex"),
+        PromptInjectionAttack(malicious_instruction="i", success_substring="Sure, ", success_mode="startswith"),
+    ]
+    attacks += [PromptInjectionAttack(malicious_instruction="i", success_substring=f"word{n}")
+                for n in range(20)]
+    return attacks
+
+
+OUTPUTS = [
+    "OMG that is great",
+    "  omg, a BANANA",
+    "Sure, here is code 1234.",
+    "sure thing",
+    "nothing to see",
+    "word3 and word17 but not word",
+    "",
+]
+
+
+@pytest.mark.parametrize("pattern_set_min", [1, 1000])
+def test_scorer_agrees_with_each_attack(monkeypatch, pattern_set_min):
+    monkeypatch.setattr(scoring, "PATTERN_SET_MIN", pattern_set_min)
+    attacks = _attacks()
+    matrix = SuccessScorer(attacks).score(OUTPUTS)
+    expected = np.array([[a.detect_success(o) for a in attacks] for o in OUTPUTS])
+    assert matrix.shape == (len(OUTPUTS), len(attacks))
+    assert (matrix == expected).all()
+    assert matrix[:, 0].tolist() == [False, True, False, False, False, False, False]
+    assert matrix[:, 1].tolist() == [True, True, False, False, False, False, False]
+
+
+def test_attacks_without_a_rule_fall_back_to_their_own_detection():
+    class Custom(PromptInjectionAttack):
+        def success_rule(self):
+            return None
+
+        def detect_success(self, output):
+            return len(output) > 10
+
+    custom = Custom(malicious_instruction="i")
+    matrix = SuccessScorer([custom]).score(OUTPUTS)
+    assert matrix[:, 0].tolist() == [len(o) > 10 for o in OUTPUTS]
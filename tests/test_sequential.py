@@ -0,0 +1,70 @@
+import random
+
+from agent.agent_context import AgentContext
+from attacks.prompt_injection import PromptInjectionAttack
+from experiments.experiment_config import ExperimentConfig
+from experiments.experiment_runner import ExperimentRunner
+from experiments.sequential import SequentialEstimator, wilson_interval
+
+
+def test_wilson_interval_contains_rate_and_shrinks():
+    lo, hi = wilson_interval(50, 100)
+    assert lo < 0.5 < hi
+    lo2, hi2 = wilson_interval(500, 1000)
+    assert hi2 - lo2 < hi - lo
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+def test_stops_only_once_interval_is_narrow_enough():
+    rng = random.Random(0)
+    estimator = SequentialEstimator(target_width=0.1, min_evals=10)
+    while estimator.stop_reason() is None:
+        estimator.update(rng.random() < 0.5)
+
+    lo, hi = estimator.interval()
+    assert estimator.stop_reason() == "ci_width"
+    assert hi - lo <= 0.1
+    assert estimator.n > 300
+
+
+def _contexts(n):
+    return [
+        AgentContext(label=f"ctx_{i}", system_prompt="You are a helpful assistant.",
+                     user_input=f"Write email {i}.", memory=[])
+        for i in range(n)
+    ]
+
+
+# Regression: the baseline pass (no attack, so no successes) used to stop every
+# adaptive pass with any success at min_evals with stop_reason "baseline_test"
+def test_adaptive_run_after_baseline_meets_width_target(tmp_path):
+    config = ExperimentConfig(
+        mode="fake",
+        memory_path=str(tmp_path / "memory.json"),
+        output_path=str(tmp_path / "results.jsonl"),
+        adaptive=True,
+        ci_target_width=0.2,
+        adaptive_min_evals=10,
+    )
+    runner = ExperimentRunner(config)
+    runner.reset_memory()
+    runner.reset_results()
+    contexts = _contexts(400)
+
+    runner.run(attack_context=None, eval_contexts=contexts, build_attack=lambda: None)
+
+    # The fake LLM cycles through three responses, so one in three outputs matches
+    summary = runner.run(
+        attack_context=None,
+        eval_contexts=contexts,
+        build_attack=lambda: PromptInjectionAttack(
+            malicious_instruction="unused", success_substring="response 1"
+        )
+    )
+
+    stats = summary["adaptive"]["asr"]
+    lo, hi = stats["ci"]
+    assert stats["stop_reason"] == "ci_width"
+    assert hi - lo <= 0.2
+    assert summary["eval_count"] > 10
+    assert lo < 1 / 3 < hi
@@ -0,0 +1,23 @@
+import json
+import urllib.request
+
+from agent.stub_config import StubConfig
+from agent.stub_server import StubServer, _render
+
+
+def test_render_keeps_unknown_and_malformed_placeholders():
+    fields = {"user": "hi", "system": "", "memory": "m"}
+    assert _render("{user} {other}", fields) == "hi {other}"
+    assert _render('{"json": 1} {user}', fields) == '{"json": 1} {user}'
+    assert _render("{0} and {", fields) == "{0} and {"
+
+
+def test_literal_braces_are_served_not_500():
+    config = StubConfig(responses=['{"answer": "{user}"}'])
+    with StubServer(config) as server:
+        body = json.dumps({"messages": [{"role": "user", "content": "hello"}]}).encode("utf-8")
+        request = urllib.request.Request(f"{server.base_url}/chat/completions", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            reply = json.loads(response.read())
+    assert reply["choices"][0]["message"]["content"] == '{"answer": "{user}"}'
@@ -0,0 +1,46 @@
+import random
+
+from agent.agent_context import AgentContext
+from attacks.prompt_injection import PromptInjectionAttack
+from attacks.trigger_matcher import TriggerMatcher
+
+TRIGGERS = ["Note:", "PS:", "note", "Note: PS", "ab", "b", "abc", "cab"]
+
+
+def _attacks():
+    attacks = [PromptInjectionAttack(malicious_instruction=f"do {t}", trigger=t) for t in TRIGGERS]
+    attacks.append(PromptInjectionAttack(malicious_instruction="always"))
+    attacks.append(PromptInjectionAttack(malicious_instruction="again", trigger="PS:"))
+    return attacks
+
+
+def _text(rng):
+    return "".join(rng.choice("abcNotePS: ") for _ in range(rng.randint(0, 12)))
+
+
+def test_matches_what_each_attack_would_decide_alone():
+    rng = random.Random(0)
+    attacks = _attacks()
+    matcher = TriggerMatcher(attacks)
+    for _ in range(300):
+        context = AgentContext(label=_text(rng), system_prompt=_text(rng), user_input=_text(rng),
+                               memory=[_text(rng) for _ in range(rng.randint(0, 3))])
+        expected = [a for a in attacks if a.should_trigger(context)]
+        assert matcher.match(context) == expected
+        assert matcher.match(context.to_dict()) == expected
+
+
+def test_triggers_do_not_span_fields_or_memory_entries():
+    matcher = TriggerMatcher([PromptInjectionAttack(malicious_instruction="x", trigger="Note:")])
+    context = {"label": "", "system_prompt": "Not", "user_input": "e: hi", "memory": ["No", "te:"]}
+    assert matcher.match(context) == []
+    context["memory"].append("a Note: b")
+    assert matcher.match_indices(context) == [0]
+
+
+def test_only_the_given_fields_are_searched():
+    attack = PromptInjectionAttack(malicious_instruction="x", trigger="PS:")
+    matcher = TriggerMatcher([attack], fields=("user_input",))
+    assert matcher.match({"user_input": "hello", "memory": ["PS: hi"]}) == []
+    assert matcher.match({"user_input": "PS: hi"}) == [attack]
+    assert TriggerMatcher([]).match({"user_input": "PS:"}) == []